@@ -0,0 +1,32 @@
+import argparse
+import time
+
+from fixtures import FIXTURES, use_fixtures
+
+# Records the fixture sessions: FastF1's HTTP cache plus the dashboard's disk
+# cache (tiers, derived tables, per-lap telemetry), exactly as warm_cache.py
+# writes them for the app.
+#
+#   python benchmarks/record_fixtures.py [dry wet red_flag]
+
+def main():
+    parser = argparse.ArgumentParser(description="Record the benchmark fixture sessions (needs network).")
+    parser.add_argument("fixtures", nargs="*", choices=list(FIXTURES), default=list(FIXTURES))
+    args = parser.parse_args()
+
+    use_fixtures(offline=False)
+    from event_index import get_event_index
+    from warm_cache import SESSION_TIERS, warm_session
+
+    for name in args.fixtures:
+        year, event = FIXTURES[name]
+        # Stores the season in the fixture event index
+        get_event_index().events(year)
+        for session_type in SESSION_TIERS:
+            start = time.perf_counter()
+            status, _ = warm_session((year, event, session_type))
+            print(f"{name}: {year} {event} {session_type}: {status} ({time.perf_counter() - start:.1f}s)",
+                  flush=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+from fixtures import BENCH_DIR, FIXTURE_DIR, FIXTURES, use_fixtures
+
+# Runs every view's data prep and chart build headlessly against the recorded
+# fixtures, with Streamlit widgets stubbed to their defaults, and compares wall
+# time, allocations and chart payload size with a stored baseline.
+#
+#   python benchmarks/run_benchmarks.py                     # compare with baseline.json
+#   python benchmarks/run_benchmarks.py --update-baseline   # record a new baseline
+
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+
+# Allowed growth over the baseline before a result counts as a regression
+TOLERANCE = {"warm_ms": 0.25, "cold_ms": 0.25, "peak_alloc_kb": 0.20, "payload_bytes": 0.05}
+
+# --- Streamlit stand-in: widgets return their defaults, charts are captured ---
+class _Element:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        # Output calls on containers and placeholders (markdown, info, metric, ...)
+        return lambda *args, **kwargs: None
+
+class StreamlitStub:
+
+    def __init__(self):
+        self.widgets = {}  # widget key -> value overriding the default
+        self.charts = []
+
+    def _value(self, key, default):
+        return self.widgets.get(key, default)
+
+    def checkbox(self, label, value=False, key=None, **kwargs):
+        return self._value(key, value)
+
+    def toggle(self, label, value=False, key=None, **kwargs):
+        return self._value(key, value)
+
+    def selectbox(self, label, options, index=0, key=None, **kwargs):
+        options = list(options)
+        return self._value(key, options[index] if options else None)
+
+    def slider(self, label, min_value=None, max_value=None, value=None, key=None, **kwargs):
+        return self._value(key, value)
+
+    def select_slider(self, label, options=(), value=None, key=None, **kwargs):
+        return self._value(key, value)
+
+    def columns(self, spec, **kwargs):
+        return [_Element() for _ in range(spec if isinstance(spec, int) else len(spec))]
+
+    def expander(self, *args, **kwargs):
+        return _Element()
+
+    def empty(self):
+        return _Element()
+
+    def altair_chart(self, chart, **kwargs):
+        self.charts.append(chart)
+
+    def __getattr__(self, name):
+        # markdown, caption, warning, dataframe, divider, ...
+        return lambda *args, **kwargs: None
+
+def install_stub():
+    import streamlit as st
+    stub = StreamlitStub()
+    for name in ("checkbox", "toggle", "selectbox", "slider", "select_slider", "columns", "expander",
+                 "empty", "altair_chart", "markdown", "caption", "warning", "dataframe", "divider",
+                 "info", "subheader", "metric"):
+        setattr(st, name, getattr(stub, name))
+    # Views run as plain functions
+    st.fragment = lambda func=None, **kwargs: func if func is not None else (lambda f: f)
+    return stub
+
+# --- Benchmark cases: (name, view function, widget overrides) ---
+def benchmark_cases(plot_functions):
+    return [
+        ("race_overview", plot_functions.race_overview, {}),
+        ("race_positions", plot_functions.racepositions_plt, {}),
+        ("tyre_strategies", plot_functions.tyre_strategies, {}),
+        ("lap_time", plot_functions.lap_time, {}),
+        ("telemetry_comparison", plot_functions.telemetry_driver_comparison, {}),
+        ("tyre_degradation", plot_functions.tyre_degradation, {}),
+        ("tyre_degradation_compare", plot_functions.tyre_degradation, {"tyre_deg_compare": True}),
+    ]
+
+def payload_bytes(charts):
+    # As Streamlit sends them: spec JSON without inline data, plus the Arrow datasets
+    import metrics
+    return sum(metrics.chart_bytes(chart) for chart in charts)
+
+def run_case(stub, func, widgets, year, event, repeats):
+    stub.widgets = widgets
+    times = []
+    peak = 0
+    for _ in range(repeats):
+        stub.charts = []
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        func(year, event, "Race")
+        times.append((time.perf_counter() - start) * 1000)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {
+        "cold_ms": round(times[0], 1),
+        "warm_ms": round(statistics.median(times[1:]) if len(times) > 1 else times[0], 1),
+        "peak_alloc_kb": round(peak / 1024, 1),
+        "payload_bytes": payload_bytes(stub.charts),
+    }
+
+# --- Baseline comparison ---
+def compare(results, baseline):
+    regressions = []
+    for fixture, views in results.items():
+        for view, result in views.items():
+            base = baseline.get(fixture, {}).get(view)
+            if base is None:
+                continue
+            for metric, tolerance in TOLERANCE.items():
+                if metric in base and base[metric] and result[metric] > base[metric] * (1 + tolerance):
+                    regressions.append(f"{fixture}/{view}: {metric} {base[metric]} -> {result[metric]}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard views against recorded sessions.")
+    parser.add_argument("--fixtures", nargs="+", choices=list(FIXTURES), default=list(FIXTURES))
+    parser.add_argument("--views", nargs="+", help="only these benchmark cases")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    if not os.path.isdir(os.path.join(FIXTURE_DIR, "cache")):
+        print(f"No fixtures in {FIXTURE_DIR}; record them first with benchmarks/record_fixtures.py")
+        return 2
+
+    use_fixtures(offline=True)
+    stub = install_stub()
+    import streamlit as st
+    import data_loader
+    import plot_functions
+
+    results = {}
+    for fixture in args.fixtures:
+        year, event = FIXTURES[fixture]
+        # Every fixture starts from the disk cache, like a fresh app process;
+        # warm runs then hit the prepared view data, like a second user would
+        data_loader.get_session_store.clear()
+        st.cache_data.clear()
+        results[fixture] = {}
+        for name, func, widgets in benchmark_cases(plot_functions):
+            if args.views and name not in args.views:
+                continue
+            result = run_case(stub, func, widgets, year, event, args.repeats)
+            results[fixture][name] = result
+            print(f"{fixture:9s} {name:26s} cold {result['cold_ms']:9.1f} ms  warm {result['warm_ms']:8.1f} ms  "
+                  f"peak alloc {result['peak_alloc_kb']:10.1f} KB  payload {result['payload_bytes']:9d} B", flush=True)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=1)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare with; record one with --update-baseline")
+        return 0
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f))
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    print("No regressions" if not regressions else f"{len(regressions)} regression(s)")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,7 +2,8 @@ import streamlit as st
 import matplotlib.units as munits
 import datetime
 from plot_functions import *
-from data_loader import get_race_schedule
+from data_loader import get_race_schedule , get_session_store , start_prefetch
+import metrics
 
 munits.registry.clear()  # clear timple converter
 
@@ -22,25 +23,78 @@ display_names = [event for event in events]
 
 event = st.sidebar.selectbox("Select Grand Prix", options=display_names, index = 0)
 
-tab1 , tab2 , tab3 , tab4 , tab5 , tab6 = st.tabs(["Race Overview", "Race Positions", 
-                                                "Tyre Strategies",  "Lap Time" ,
-                                                "Telemetry Comparison" , "Tyre Degradation" ])
-
-with tab1:
-    st.subheader("Race Overview")
-    race_overview(year , event , "Race")
-with tab2:
-    st.subheader("Race Positions")
-    racepositions_plt(year , event , "Race")
-with tab3:
-    st.subheader("Tyre Strategies")
-    tyre_strategies(year , event , "Race")
-with tab4:
-    st.subheader("Lap Times")
-    lap_time(year , event , "Race")
-with tab5:
-    st.subheader("Telemetry Comparison")
-    telemetry_driver_comparison(year , event , "Race")
-with tab6:
-    st.subheader("Tyre Degradation Analysis")
-    tyre_degradation(year , event , "Race")
+# --- Warm the selected event and its neighbours in the background ---
+# A new selection cancels what is still queued for the previous one
+prefetch = st.session_state.get("prefetch")
+if prefetch is None or prefetch.selection != (year, event):
+    if prefetch is not None:
+        prefetch.cancel()
+    st.session_state["prefetch"] = start_prefetch(year, event, events)
+
+# --- Views: (title, render function, widget key prefixes) ---
+VIEWS = {
+    "Race Overview": ("Race Overview", race_overview, ()),
+    "Race Positions": ("Race Positions", racepositions_plt, ("race_position_", "racepositions_")),
+    "Tyre Strategies": ("Tyre Strategies", tyre_strategies, ("race_position1_", "tyre_strat_")),
+    "Lap Time": ("Lap Times", lap_time, ("driver_laptime_",)),
+    "Telemetry Comparison": ("Telemetry Comparison", telemetry_driver_comparison, ("driver_1", "driver_2", "telemetry_")),
+    "Tyre Degradation": ("Tyre Degradation Analysis", tyre_degradation, ("tyre_deg_",)),
+}
+
+# Only the selected view runs, so hidden views cost nothing per rerun
+view = st.radio("View", list(VIEWS), horizontal=True, key="active_view", label_visibility="collapsed")
+
+# --- Keep widget state of hidden views alive across reruns ---
+# Streamlit drops the state of widgets that are not rendered; writing the
+# value back through session state keeps it until the view is shown again.
+hidden_prefixes = tuple(prefix for name, (_, _, prefixes) in VIEWS.items() if name != view
+                        for prefix in prefixes)
+for key in list(st.session_state.keys()):
+    if key.startswith(hidden_prefixes):
+        st.session_state[key] = st.session_state[key]
+
+# --- Optional performance panel, filled in once the view has run ---
+def show_performance_panel(container):
+    perf = metrics.snapshot()
+    cache = perf["cache"]
+    with container:
+        st.caption(f"Sessions in memory: {cache.get('sessions', 0)}  |  "
+                   f"{cache.get('bytes', 0) / 1e6:.0f} of {cache.get('max_bytes', 0) / 1e6:.0f} MB")
+        st.caption(f"Session hits: {cache.get('hits', 0)}  |  misses: {cache.get('misses', 0)}  |  "
+                   f"evictions: {cache.get('evictions', 0)}")
+        st.caption(f"Derived table hits: {cache.get('derived_hits', 0)}  |  misses: {cache.get('derived_misses', 0)}  |  "
+                   f"lap telemetry hits: {cache.get('lap_telemetry_hits', 0)}  |  misses: {cache.get('lap_telemetry_misses', 0)}")
+        if perf['peak_rss_bytes']:
+            st.caption(f"Peak memory: {perf['peak_rss_bytes'] / 1e6:.0f} MB")
+        # Per session and table, after compaction
+        memory = [{"Session": row["Session"], "Table": row["Table"], "Rows": row["Rows"],
+                   "MB": round(row["Bytes"] / 1e6, 2), "Saved (MB)": round(row["Saved"] / 1e6, 2)}
+                  for row in get_session_store().memory_report()]
+        if memory:
+            st.dataframe(memory, hide_index=True, use_container_width=True)
+        stages = [
+            {"View": row["view"], "Stage": row["stage"], "Runs": row["count"],
+             "Mean (ms)": round(1000 * row["total_seconds"] / row["count"], 1),
+             "Max (ms)": round(1000 * row["max_seconds"], 1)}
+            for row in perf["stages"]
+        ]
+        st.dataframe(stages, hide_index=True, use_container_width=True)
+        payloads = [{"View": row["view"], "Last chart (KB)": round(row["last_bytes"] / 1024, 1)}
+                    for row in perf["payloads"]]
+        if payloads:
+            st.dataframe(payloads, hide_index=True, use_container_width=True)
+        st.download_button("Export Prometheus metrics", metrics.prometheus_text(),
+                           file_name="f1_dashboard_metrics.prom", mime="text/plain")
+
+show_perf = st.sidebar.toggle("Performance panel", value=False, key="perf_panel")
+perf_container = st.sidebar.container()
+
+title, render_view, _ = VIEWS[view]
+st.subheader(title)
+try:
+    render_view(year , event , "Race")
+finally:
+    metrics.record_cache(get_session_store().stats())
+    metrics.write_prometheus()
+    if show_perf:
+        show_performance_panel(perf_container)
@@ -0,0 +1,216 @@
+import importlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Key-value store behind the dashboard's cache of session tiers, derived tables
+# and lap telemetry. Keys are slash-separated names ("fastf1-3.8.3/2023/
+# Bahrain_Grand_Prix/Race/laps"); values are DataFrames or JSON metadata.
+# Every Streamlit worker on a host opens the same store, so a session one worker
+# has loaded is warm for all of them.
+#
+#   parquet  compressed Parquet files under the cache directory (default)
+#   arrow    uncompressed Arrow IPC files, memory-mapped on read: telemetry is
+#            served from the page cache shared by all workers instead of being
+#            decoded into each one. Point F1_DASHBOARD_CACHE at /dev/shm to keep
+#            the files in shared memory.
+#   memory   in-process dict; a stand-in for tests and single-worker runs
+#   module:attr  any other backend, built by calling attr(root)
+
+# --- Exclusive lock on an open file, across processes; returns its release ---
+def lock_file(f):
+    try:
+        import fcntl
+    except ImportError:
+        pass
+    else:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        return lambda: fcntl.flock(f, fcntl.LOCK_UN)
+    try:
+        import msvcrt
+    except ImportError:
+        # Neither available: threads of this process are still serialized
+        return lambda: None
+    # Windows: lock the first byte; LK_LOCK gives up after about 10 seconds, so retry
+    while True:
+        try:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            break
+        except OSError:
+            continue
+    def release():
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    return release
+
+# --- Files under a root directory, one per key ---
+class FileBackend:
+
+    suffix = None
+
+    def __init__(self, root):
+        self.root = root
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def path(self, key, suffix):
+        return os.path.join(self.root, *key.split("/")) + suffix
+
+    def _replace(self, path, write):
+        # Write next to the target and rename, so readers never see half a file
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def put_table(self, key, df):
+        table = pa.Table.from_pandas(pd.DataFrame(df))
+        self._replace(self.path(key, self.suffix), lambda path: self._write(table, path))
+
+    def get_table(self, key, where=None, shared=False):
+        # where: pyarrow expression selecting rows; shared: the frame may be read-only
+        path = self.path(key, self.suffix)
+        if not os.path.exists(path):
+            return None
+        return self._read(path, where, shared)
+
+    def has_table(self, key):
+        return os.path.exists(self.path(key, self.suffix))
+
+    def put_meta(self, key, meta):
+        def write(path):
+            with open(path, "w") as f:
+                json.dump(meta, f, default=str)
+        self._replace(self.path(key, ".json"), write)
+
+    def get_meta(self, key):
+        path = self.path(key, ".json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def has_meta(self, key):
+        return os.path.exists(self.path(key, ".json"))
+
+    def table_names(self, prefix):
+        directory = os.path.join(self.root, *prefix.split("/"))
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-len(self.suffix)] for name in os.listdir(directory) if name.endswith(self.suffix))
+
+    @contextmanager
+    def lock(self, key):
+        # One holder per key across processes (file lock) and threads; released if the holder dies
+        with self._locks_lock:
+            thread_lock = self._locks.setdefault(key, threading.Lock())
+        path = self.path(key, ".lock")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with thread_lock, open(path, "a") as f:
+            release = lock_file(f)
+            try:
+                yield
+            finally:
+                release()
+
+class ParquetBackend(FileBackend):
+
+    suffix = ".parquet"
+
+    def _write(self, table, path):
+        pq.write_table(table, path)
+
+    def _read(self, path, where, shared):
+        return pq.read_table(path, memory_map=True, filters=where).to_pandas()
+
+class ArrowBackend(FileBackend):
+
+    suffix = ".arrow"
+
+    def _write(self, table, path):
+        # Uncompressed, so reads map the file instead of decoding it
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    def _read(self, path, where, shared):
+        table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        if where is not None:
+            table = table.filter(where)
+        if shared:
+            # Numeric and time columns without nulls stay views of the mapped pages
+            return table.to_pandas(split_blocks=True)
+        return table.to_pandas()
+
+# --- In-process stand-in: same interface, values kept as Arrow tables ---
+class MemoryBackend:
+
+    def __init__(self, root=None):
+        self._tables = {}
+        self._meta = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def put_table(self, key, df):
+        table = pa.Table.from_pandas(pd.DataFrame(df))
+        with self._lock:
+            self._tables[key] = table
+
+    def get_table(self, key, where=None, shared=False):
+        table = self._tables.get(key)
+        if table is None:
+            return None
+        if where is not None:
+            table = table.filter(where)
+        return table.to_pandas()
+
+    def has_table(self, key):
+        return key in self._tables
+
+    def put_meta(self, key, meta):
+        # Round-tripped through JSON like the file backends
+        with self._lock:
+            self._meta[key] = json.dumps(meta, default=str)
+
+    def get_meta(self, key):
+        meta = self._meta.get(key)
+        return None if meta is None else json.loads(meta)
+
+    def has_meta(self, key):
+        return key in self._meta
+
+    def table_names(self, prefix):
+        prefix = prefix.rstrip("/") + "/"
+        with self._lock:
+            keys = list(self._tables)
+        return sorted(key[len(prefix):] for key in keys if key.startswith(prefix) and "/" not in key[len(prefix):])
+
+    @contextmanager
+    def lock(self, key):
+        with self._lock:
+            key_lock = self._locks.setdefault(key, threading.Lock())
+        with key_lock:
+            yield
+
+BACKENDS = {
+    "parquet": ParquetBackend,
+    "arrow": ArrowBackend,
+    "memory": MemoryBackend,
+}
+
+def make_backend(name, root):
+    if name in BACKENDS:
+        return BACKENDS[name](root)
+    if ":" in name:
+        module_name, attr = name.split(":", 1)
+        return getattr(importlib.import_module(module_name), attr)(root)
+    raise ValueError(f"Unknown cache backend '{name}'")
@@ -0,0 +1,141 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Width in pixels the telemetry charts are sampled for. They stretch to the container,
+# whose width Streamlit does not report to Python, so it is set per deployment
+DEFAULT_CHART_WIDTH = int(os.environ.get("F1_CHART_WIDTH_PX", "1200"))
+# Points kept per pixel of chart width, per series
+POINTS_PER_PIXEL = 0.5
+
+# Downsampling method per telemetry channel; brake is on/off, so spikes must survive
+TELEMETRY_CHANNELS = {"Speed": "lttb", "Throttle": "lttb", "Brake": "minmax"}
+# Telemetry precision worth drawing: decimetres and tenths of km/h or %
+TELEMETRY_DECIMALS = {"Distance": 1, "Speed": 1, "Throttle": 1}
+# Delta traces: milliseconds of gap, tenths of km/h
+DELTA_CHANNELS = {"Delta": "lttb"}
+DELTA_DECIMALS = {"Distance": 1, "Delta": 3, "SpeedDelta": 1}
+
+# Decimals worth drawing for float columns sent to the browser
+DEFAULT_DECIMALS = 3
+
+# --- Smallest dtype that holds a column's values ---
+def compact_series(series, decimals=DEFAULT_DECIMALS):
+    if pd.api.types.is_bool_dtype(series):
+        return series
+    if pd.api.types.is_numeric_dtype(series):
+        values = series.dropna()
+        if len(values) and (values % 1 == 0).all():
+            for kind, info in (("Int8", np.iinfo(np.int8)), ("Int16", np.iinfo(np.int16)),
+                               ("Int32", np.iinfo(np.int32))):
+                if info.min <= values.min() and values.max() <= info.max:
+                    # Nullable integers only where there are gaps
+                    return series.astype(kind if series.isna().any() else kind.lower())
+        # Streamlit sends chart data as Arrow, so float32 halves it. Rounded in
+        # float64, so compacted float32 telemetry charts the same values as FastF1's
+        return series.astype("float64").round(decimals).astype("float32")
+    if pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+        return series.astype("category")
+    return series
+
+# --- Only the fields a chart encodes or shows in tooltips, in compact dtypes ---
+def chart_frame(df, columns, decimals=None):
+    decimals = decimals or {}
+    columns = [column for column in dict.fromkeys(columns) if column in df.columns]
+    frame = df.loc[:, columns].reset_index(drop=True)
+    for column in frame.columns:
+        frame[column] = compact_series(frame[column], decimals.get(column, DEFAULT_DECIMALS))
+    return frame
+
+# --- One copy of the columns a group of layers/panels encodes ---
+def shared_data(df, columns, decimals=None):
+    # Pass the result as `data=` of alt.layer/alt.vconcat and build the
+    # sub-charts with alt.Chart() so they reference it instead of embedding copies
+    return chart_frame(df, columns, decimals)
+
+# --- Number of points worth sending for a chart of a given width ---
+def point_budget(width=DEFAULT_CHART_WIDTH, points_per_pixel=POINTS_PER_PIXEL):
+    return max(int(width * points_per_pixel), 3)
+
+# --- Largest-Triangle-Three-Buckets: keeps the points that shape the line ---
+def lttb_indices(x, y, n_out):
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # First and last points are always kept; the rest is split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    indices = np.empty(n_out, dtype=int)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    selected = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        if i < n_out - 3:
+            next_start, next_end = edges[i + 1], edges[i + 2]
+        else:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        # Triangle area between the last kept point, each candidate and the next bucket's mean
+        area = np.abs(
+            (x[selected] - avg_x) * (y[start:end] - y[selected])
+            - (x[selected] - x[start:end]) * (avg_y - y[selected])
+        )
+        selected = start + int(np.argmax(np.nan_to_num(area, nan=-1.0)))
+        indices[i + 1] = selected
+    return indices
+
+# --- Min/max per bucket: keeps short spikes (e.g. brake applications) ---
+def minmax_indices(y, n_out):
+    n = len(y)
+    if n_out >= n or n_out < 2:
+        return np.arange(n)
+
+    size = int(np.ceil(n / (n_out // 2)))
+    buckets = int(np.ceil(n / size))
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(buckets, size)
+
+    offsets = np.arange(buckets) * size
+    low = offsets + np.argmin(np.where(np.isnan(padded), np.inf, padded), axis=1)
+    high = offsets + np.argmax(np.where(np.isnan(padded), -np.inf, padded), axis=1)
+    indices = np.unique(np.concatenate(([0, n - 1], low, high)))
+    return indices[indices < n]
+
+# --- Downsample each series of a frame along x ---
+def downsample(df, x, channels, n_out=None, by=None):
+    # channels maps column -> "lttb" or "minmax"; the kept rows are the union over channels
+    if df.empty or not channels:
+        return df
+    if n_out is None:
+        n_out = point_budget()
+    per_channel = max(n_out // len(channels), 3)
+
+    groups = [df] if by is None else [group for _, group in df.groupby(by, sort=False, observed=True)]
+    parts = []
+    for group in groups:
+        group = group.sort_values(x)
+        xs = group[x].to_numpy(dtype=float)
+        keep = [np.array([0, len(group) - 1])]
+        for column, method in channels.items():
+            ys = group[column].to_numpy(dtype=float)
+            if method == "minmax":
+                keep.append(minmax_indices(ys, per_channel))
+            else:
+                keep.append(lttb_indices(xs, ys, per_channel))
+        parts.append(group.iloc[np.unique(np.concatenate(keep))])
+    return pd.concat(parts, ignore_index=True)
+
+# --- Keep a percentage window of the lap and re-sample it at the full budget ---
+def zoom_and_downsample(df, zoom, by, width=DEFAULT_CHART_WIDTH, channels=None, max_distance=None):
+    # max_distance: lap length the percentages refer to, when df covers only part of it
+    if max_distance is None:
+        max_distance = df["Distance"].max()
+    low, high = zoom[0] / 100 * max_distance, zoom[1] / 100 * max_distance
+    window = df[(df["Distance"] >= low) & (df["Distance"] <= high)]
+    return downsample(window, "Distance", channels or TELEMETRY_CHANNELS, point_budget(width), by=by)
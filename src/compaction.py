@@ -0,0 +1,90 @@
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Compaction of loaded sessions, so more of them fit in a worker's memory:
+# repeated strings in the laps become categoricals and numeric telemetry
+# channels are downcast. Times stay timedelta64[ns]/datetime64[ns], which
+# FastF1's lap slicing and channel merging require.
+
+# Set to 0 to keep sessions exactly as FastF1 loads them
+ENABLED = os.environ.get("F1_COMPACT_SESSIONS", "1") == "1"
+
+# String columns of the laps become categoricals when at most this share of values is distinct
+CATEGORY_RATIO = 0.5
+
+# Telemetry channels and their compact dtype; float32 keeps positions to the millimetre
+TELEMETRY_DTYPES = {
+    "X": "float32", "Y": "float32", "Z": "float32",
+    "Speed": "float32", "RPM": "float32", "Throttle": "float32",
+    "nGear": "int8", "DRS": "int8",
+}
+
+# --- Smallest safe dtype per column ---
+def is_string_column(series):
+    if not pd.api.types.is_object_dtype(series) and not pd.api.types.is_string_dtype(series):
+        return False
+    values = series.dropna()
+    return len(values) > 0 and values.map(type).eq(str).all()
+
+def compact_laps(laps):
+    for column in laps.columns:
+        series = laps[column]
+        if is_string_column(series):
+            if series.nunique() <= CATEGORY_RATIO * len(series):
+                laps[column] = series.astype("category")
+        elif pd.api.types.is_float_dtype(series) and series.dtype != np.float32:
+            # Lap numbers, stints, positions, tyre life and speed traps
+            laps[column] = series.astype("float32")
+    return laps
+
+def compact_telemetry(tel):
+    for column, dtype in TELEMETRY_DTYPES.items():
+        if column not in tel.columns or tel[column].dtype == dtype:
+            continue
+        series = tel[column]
+        if np.dtype(dtype).kind == "i":
+            # Integer channels only when every value fits
+            info = np.iinfo(dtype)
+            if series.isna().any() or series.min() < info.min or series.max() > info.max:
+                continue
+        tel[column] = series.astype(dtype)
+    return tel
+
+def frame_nbytes(df):
+    return int(df.memory_usage(deep=True).sum()) if df is not None else 0
+
+# --- Compact the given tiers of a session in place; returns bytes per table before and after ---
+def compact_session(session, tiers):
+    report = {}
+    with warnings.catch_warnings():
+        # Laps and Telemetry warn on column assignment to their subclassed frames
+        warnings.simplefilter("ignore", UserWarning)
+        if "laps" in tiers and hasattr(session, "_laps"):
+            before = frame_nbytes(session._laps)
+            compact_laps(session._laps)
+            report["laps"] = (before, frame_nbytes(session._laps))
+        if "telemetry" in tiers:
+            for name, attr in (("car_data", "_car_data"), ("pos_data", "_pos_data")):
+                channels = getattr(session, attr, {})
+                before = sum(frame_nbytes(tel) for tel in channels.values())
+                for tel in channels.values():
+                    compact_telemetry(tel)
+                report[name] = (before, sum(frame_nbytes(tel) for tel in channels.values()))
+    return report
+
+# --- Rows and bytes per table of a loaded session ---
+def session_memory_report(session):
+    rows = []
+    for name, attr in (("laps", "_laps"), ("results", "_results"), ("weather", "_weather_data")):
+        df = getattr(session, attr, None)
+        if df is not None:
+            rows.append({"Table": name, "Rows": len(df), "Bytes": frame_nbytes(df)})
+    for name, attr in (("car_data", "_car_data"), ("pos_data", "_pos_data")):
+        channels = getattr(session, attr, None)
+        if channels:
+            rows.append({"Table": name, "Rows": sum(len(tel) for tel in channels.values()),
+                         "Bytes": sum(frame_nbytes(tel) for tel in channels.values())})
+    return rows
@@ -1,30 +1,640 @@
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
 import fastf1
+import pandas as pd
+import pyarrow.compute as pc
 import streamlit as st
-from fastf1.ergast import Ergast
+from fastf1.core import Laps, Session, SessionResults, Telemetry
 
-# --- Functions to lazy load data ---
-@st.cache_data(ttl = 3600 , max_entries = 5 , show_spinner=True)
+from cache_backend import make_backend
+from compaction import ENABLED as COMPACT_SESSIONS , compact_session , session_memory_report
+from event_index import get_event_index
+from metrics import timed
+from session_tables import build_lap_index
+
+logger = logging.getLogger(__name__)
+
+# Byte budget for the sessions kept in memory by this process
+SESSION_CACHE_BYTES = int(os.environ.get("F1_SESSION_CACHE_MB", "1024")) * 1024 * 1024
+
+# Seconds a session that is still running (not cacheable) is kept in memory before it is reloaded
+LIVE_SESSION_TTL = int(os.environ.get("F1_LIVE_SESSION_TTL_S", "300"))
 
+# Sessions loaded concurrently in the background
+LOAD_WORKERS = int(os.environ.get("F1_LOAD_WORKERS", "4"))
+
+# Sessions warmed concurrently ahead of the user's next selection
+PREFETCH_WORKERS = int(os.environ.get("F1_PREFETCH_WORKERS", "2"))
+
+# Root of the on-disk cache of processed session tables
+CACHE_DIR = os.environ.get(
+    "F1_DASHBOARD_CACHE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "cache"),
+)
+
+# Storage of that cache, shared by all workers on the host: "parquet", "arrow"
+# (memory-mapped, e.g. with F1_DASHBOARD_CACHE on /dev/shm), "memory" or "module:attr"
+CACHE_BACKEND = os.environ.get("F1_CACHE_BACKEND", "parquet")
+
+# --- Functions to lazy load data ---
 def get_race_schedule(year):
-    ergast = Ergast()
-    schedule = ergast.get_race_schedule(year)
-    # schedule is a DataFrame with raceName column
-    return schedule['raceName'].tolist()
+    # Served from the local event index; only the current season is ever re-fetched
+    return get_event_index().event_names(year)
+
+# --- Approximate memory held by a loaded session ---
+def session_nbytes(session):
+    frames = []
+    for name in ("_laps", "_results", "_weather_data"):
+        if hasattr(session, name):
+            frames.append(getattr(session, name))
+    for name in ("_car_data", "_pos_data"):
+        frames.extend(getattr(session, name, {}).values())
+    return int(sum(df.memory_usage(deep=True).sum() for df in frames))
+
+# --- Shared cache of processed session tables (parquet, arrow or memory backend) ---
+@st.cache_resource
+def get_cache_backend():
+    return make_backend(CACHE_BACKEND, CACHE_DIR)
+
+def session_cache_key(key):
+    year, event, session_type = key
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", str(event)).strip("_")
+    return "/".join((f"fastf1-{fastf1.__version__}", str(year), slug, str(session_type)))
+
+def is_cacheable(session):
+    # Only finished sessions; timing data of a running weekend still changes
+    return pd.Timestamp.now() - pd.Timestamp(session.date) > pd.Timedelta(days=1)
+
+def write_tier(session, tier, key):
+    cache = get_cache_backend()
+    prefix = session_cache_key(key)
+    meta = {}
+    if tier == "laps":
+        cache.put_table(f"{prefix}/laps", session.laps)
+        cache.put_table(f"{prefix}/results", session.results)
+        cache.put_table(f"{prefix}/track_status", session.track_status)
+        meta = {
+            "session_info": session.session_info,
+            "total_laps": session.total_laps,
+            "session_start_time": session.session_start_time,
+        }
+    elif tier == "weather":
+        cache.put_table(f"{prefix}/weather", session.weather_data)
+    elif tier == "telemetry":
+        for name, channels in (("car", session.car_data), ("pos", session.pos_data)):
+            for drv, tel in channels.items():
+                cache.put_table(f"{prefix}/telemetry/{name}_{drv}", tel)
+        meta = {"t0_date": session.t0_date}
+    # The meta entry is written last and marks the tier as complete
+    cache.put_meta(f"{prefix}/{tier}", meta)
+
+def has_cached_tier(key, tier):
+    return get_cache_backend().has_meta(f"{session_cache_key(key)}/{tier}")
+
+def read_tier(session, tier, key):
+    cache = get_cache_backend()
+    prefix = session_cache_key(key)
+    meta = cache.get_meta(f"{prefix}/{tier}")
+    if meta is None:
+        return False
+
+    if tier == "laps":
+        session._session_info = meta["session_info"]
+        session._total_laps = meta["total_laps"]
+        start = meta["session_start_time"]
+        session._session_start_time = pd.Timedelta(start) if start is not None else None
+        session._results = SessionResults(cache.get_table(f"{prefix}/results"))
+        session._track_status = cache.get_table(f"{prefix}/track_status")
+        session._laps = Laps(cache.get_table(f"{prefix}/laps"), session=session)
+    elif tier == "weather":
+        session._weather_data = cache.get_table(f"{prefix}/weather")
+    elif tier == "telemetry":
+        session._t0_date = pd.Timestamp(meta["t0_date"])
+        session._car_data = {}
+        session._pos_data = {}
+        for table_name in cache.table_names(f"{prefix}/telemetry"):
+            name, drv = table_name.split("_", 1)
+            channels = session._car_data if name == "car" else session._pos_data
+            # Telemetry is only read, so it may stay a view of the shared cache
+            channels[drv] = Telemetry(cache.get_table(f"{prefix}/telemetry/{table_name}", shared=True),
+                                      session=session, driver=drv)
+        session._laps["LapStartDate"] = session._laps["LapStartTime"] + session._t0_date
+    return True
+
+def read_driver_telemetry(session, key, driver_number):
+    # Only this driver's car/position tables, without loading the whole tier
+    cache = get_cache_backend()
+    prefix = session_cache_key(key)
+    meta = cache.get_meta(f"{prefix}/telemetry")
+    if meta is None:
+        return False
+
+    session._t0_date = pd.Timestamp(meta["t0_date"])
+    for name, attr in (("car", "_car_data"), ("pos", "_pos_data")):
+        if not hasattr(session, attr):
+            setattr(session, attr, {})
+        tel = cache.get_table(f"{prefix}/telemetry/{name}_{driver_number}", shared=True)
+        if tel is not None:
+            getattr(session, attr)[driver_number] = Telemetry(tel, session=session, driver=driver_number)
+    return True
+
+# --- Derived tables in the cache: DataFrames, or dicts of DataFrames as one table per part ---
+# Bump when a derived-table builder changes, so tables written by older code are ignored
+DERIVED_VERSION = 1
+
+def derived_key(key, name):
+    return f"{session_cache_key(key)}/derived-v{DERIVED_VERSION}/{name}"
+
+def write_derived(table, key, name):
+    cache = get_cache_backend()
+    derived = derived_key(key, name)
+    if isinstance(table, pd.DataFrame):
+        cache.put_table(derived, table)
+        return True
+    if isinstance(table, dict) and table and all(isinstance(part, pd.DataFrame) for part in table.values()):
+        for part, df in table.items():
+            cache.put_table(f"{derived}/{part}", df)
+        # Written last, marks the table as complete
+        cache.put_meta(f"{derived}/parts", list(table))
+        return True
+    # Anything else (e.g. the lap index) is rebuilt from the laps
+    return False
+
+def read_derived(key, name):
+    cache = get_cache_backend()
+    derived = derived_key(key, name)
+    table = cache.get_table(derived)
+    if table is not None:
+        return table
+    parts = cache.get_meta(f"{derived}/parts")
+    if parts is not None:
+        return {part: cache.get_table(f"{derived}/{part}") for part in parts}
+    return None
+
+# --- Merged telemetry of every lap of a driver, one table per driver ---
+def lap_slices_key(key, driver):
+    return f"{session_cache_key(key)}/lap_telemetry/{driver}"
+
+def write_lap_slices(session, key, driver):
+    parts = []
+    for _, lap in session.laps.pick_drivers(driver).iterlaps():
+        if pd.isna(lap['LapNumber']) or pd.isna(lap['LapStartTime']) or pd.isna(lap['Time']):
+            continue
+        try:
+            tel = merge_lap_telemetry(lap)
+        except Exception:
+            logger.info("No telemetry for %s lap %s of %s", driver, lap['LapNumber'], key)
+            continue
+        tel['LapNumber'] = int(lap['LapNumber'])
+        parts.append(tel)
+    if not parts:
+        return False
+    get_cache_backend().put_table(lap_slices_key(key, driver), pd.concat(parts, ignore_index=True))
+    return True
+
+def read_lap_slice(key, driver, lap_number):
+    table = get_cache_backend().get_table(lap_slices_key(key, driver),
+                                          where=pc.field("LapNumber") == int(lap_number))
+    if table is None:
+        return None
+    return table.drop(columns="LapNumber")
+
+# --- Merge car and position data for a single lap ---
+def merge_lap_telemetry(lap):
+    # Same steps as Lap.get_telemetry, minus the driver-ahead channel,
+    # which would need every other driver's position data
+    car_data = lap.get_car_data(pad=1, pad_side='both').add_distance()
+    pos_data = lap.get_pos_data(pad=1, pad_side='both')
+    merged = pos_data.merge_channels(car_data)
+    return pd.DataFrame(merged.slice_by_lap(lap, interpolate_edges=True))
+
+# --- Load tiers, cheapest first; each one upgrades the same session in place ---
+TIERS = ("laps", "weather", "telemetry")
+
+def read_cached_tier(session, tier, key):
+    try:
+        return read_tier(session, tier, key)
+    except Exception:
+        logger.warning("Ignoring unreadable %s cache for %s", tier, key, exc_info=True)
+        return False
+
+def fetch_tier(session, tier):
+    if tier == "laps":
+        session.load(laps=True, telemetry=False, weather=False)
+    elif tier == "weather":
+        session.load(laps=False, telemetry=False, weather=True, messages=False)
+    elif tier == "telemetry":
+        session.load(laps=False, telemetry=True, weather=False, messages=False)
+    else:
+        raise ValueError(f"Unknown session tier '{tier}'")
+
+def compact_tier(session, tier):
+    # Tables cached compact are read back compact, and stay shared with the cache
+    return compact_session(session, (tier,)) if COMPACT_SESSIONS else {}
+
+# --- Load one tier into the session; returns bytes before/after compaction per table ---
+def load_tier(session, tier, key):
+    if read_cached_tier(session, tier, key):
+        return compact_tier(session, tier)
+    if not is_cacheable(session):
+        fetch_tier(session, tier)
+        return compact_tier(session, tier)
+
+    # One worker on the host fetches the tier; the others wait and read what it wrote
+    with get_cache_backend().lock(f"{session_cache_key(key)}/{tier}"):
+        if read_cached_tier(session, tier, key):
+            return compact_tier(session, tier)
+        fetch_tier(session, tier)
+        compaction = compact_tier(session, tier)
+        try:
+            write_tier(session, tier, key)
+        except Exception:
+            logger.warning("Could not cache %s data for %s", tier, key, exc_info=True)
+        return compaction
+
+class _Entry:
+
+    def __init__(self, session):
+        self.session = session
+        self.tiers = set()
+        self.nbytes = 0
+        self.lock = threading.Lock()
+        self.telemetry_drivers = set()
+        self.slices = {}  # (driver, lap number) -> telemetry DataFrame
+        self.derived = {}  # table name -> table built from the session
+        self.extra_nbytes = 0
+        self.compaction = {}  # table -> (bytes as loaded, bytes after compaction)
+        self.loaded_at = time.monotonic()
+        self.cacheable = is_cacheable(session)
+
+    def is_stale(self):
+        # A running session is reloaded after the TTL, and once more when it becomes cacheable
+        if self.cacheable:
+            return False
+        return time.monotonic() - self.loaded_at > LIVE_SESSION_TTL or is_cacheable(self.session)
+
+def table_nbytes(table):
+    if isinstance(table, Session):
+        # Tables referring back to their session; it is counted with the entry
+        return 0
+    if isinstance(table, (pd.DataFrame, pd.Series)):
+        return int(table.memory_usage(deep=True).sum())
+    if isinstance(table, dict):
+        return sum(table_nbytes(value) for value in table.values())
+    if isinstance(table, (list, tuple)):
+        return sum(table_nbytes(value) for value in table)
+    if hasattr(table, "__dict__"):
+        return table_nbytes(vars(table))
+    return 0
+
+# --- Process-wide LRU store of loaded sessions ---
+class SessionStore:
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.requests = {"session": [0, 0], "derived": [0, 0], "lap_telemetry": [0, 0]}  # kind -> [hits, misses]
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> _Entry
+        self._lock = threading.Lock()
+        self._key_locks = {}  # key -> [lock, callers holding or waiting for it]
+
+    def _lookup(self, key, tiers):
+        entry = self._entries.get(key)
+        if entry is None or not tiers <= entry.tiers or entry.is_stale():
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _count(self, kind, hit):
+        # Once per request to the store, never for its internal lookups
+        with self._lock:
+            self.requests[kind][0 if hit else 1] += 1
+
+    def get(self, key, tiers=("laps",)):
+        entry, loaded = self._get_entry(key, tiers)
+        self._count("session", not loaded)
+        return entry.session
+
+    def _get_entry(self, key, tiers):
+        # Returns the entry and whether this call loaded any tier. Laps are
+        # the base every other tier is attached to
+        tiers = set(tiers) | {"laps"}
+        with self._lock:
+            entry = self._lookup(key, tiers)
+            if entry is not None:
+                return entry, False
+            key_lock = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            key_lock[1] += 1
+
+        # One loader per key; concurrent callers wait and then hit. The lock lives
+        # as long as the entry, so a tier upgrade never runs next to another load
+        try:
+            with key_lock[0]:
+                return self._load_entry(key, tiers)
+        finally:
+            with self._lock:
+                key_lock[1] -= 1
+                # Locks of keys that failed to load are not kept around
+                if key_lock[1] == 0 and key not in self._entries:
+                    self._key_locks.pop(key, None)
+
+    def _load_entry(self, key, tiers):
+        # Called with the key's lock held
+        with self._lock:
+            entry = self._lookup(key, tiers)
+            if entry is not None:
+                return entry, False
+            entry = self._entries.get(key)
+
+        if entry is None or entry.is_stale():
+            entry = _Entry(fastf1.get_session(*key))
+        for tier in TIERS:
+            if tier in tiers and tier not in entry.tiers:
+                entry.compaction.update(load_tier(entry.session, tier, key))
+                entry.tiers.add(tier)
+        entry.nbytes = session_nbytes(entry.session)
+        if entry.compaction:
+            loaded = sum(before for before, _ in entry.compaction.values())
+            compacted = sum(after for _, after in entry.compaction.values())
+            logger.info("Session %s compacted from %.1f to %.1f MB", key, loaded / 1e6, compacted / 1e6)
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+        return entry, True
+
+    def freshness(self, key):
+        # 0 for a finished session; for a running one, when its data was loaded
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            if is_cacheable(fastf1.get_session(*key)):
+                return 0
+        elif entry.cacheable:
+            return 0
+        entry, _ = self._get_entry(key, ("laps",))
+        return 0 if entry.cacheable else entry.loaded_at
+
+    def warm(self, key, tiers, cancelled=None):
+        # Write missing tiers to the disk cache without keeping the session in memory
+        with self._lock:
+            entry = self._entries.get(key)
+            in_memory = set(entry.tiers) if entry is not None else set()
+        missing = {tier for tier in tiers if tier not in in_memory and not has_cached_tier(key, tier)}
+        if not missing:
+            return False
+
+        session = fastf1.get_session(*key)
+        if not is_cacheable(session):
+            return False
+        for tier in TIERS:
+            if cancelled is not None and cancelled.is_set():
+                return False
+            # Laps are the base of every other tier; read back from disk if cached
+            if tier == "laps" or tier in missing:
+                load_tier(session, tier, key)
+        return True
+
+    def lap_telemetry(self, key, driver, lap_number):
+        entry, _ = self._get_entry(key, ("laps",))
+        with entry.lock:
+            tel = entry.slices.get((driver, lap_number))
+            if tel is None:
+                # Slices materialized by warm_cache.py
+                try:
+                    tel = read_lap_slice(key, driver, lap_number)
+                except Exception:
+                    logger.warning("Ignoring unreadable lap telemetry cache for %s %s", key, driver, exc_info=True)
+                if tel is not None:
+                    entry.slices[(driver, lap_number)] = tel
+                    entry.extra_nbytes += int(tel.memory_usage(deep=True).sum())
+            if tel is not None:
+                self._count("lap_telemetry", True)
+                return tel
+
+            # Pull in this driver's telemetry only, unless the full tier is loaded
+            driver_number = entry.session.get_driver(driver)['DriverNumber']
+            has_driver = "telemetry" in entry.tiers or driver_number in entry.telemetry_drivers
+            if not has_driver and read_driver_telemetry(entry.session, key, driver_number):
+                entry.telemetry_drivers.add(driver_number)
+                entry.nbytes += sum(int(getattr(entry.session, attr)[driver_number].memory_usage(deep=True).sum())
+                                    for attr in ("_car_data", "_pos_data")
+                                    if driver_number in getattr(entry.session, attr))
+                has_driver = True
+        if not has_driver:
+            # Nothing on disk yet: load the full tier once, which also caches it per driver
+            entry, _ = self._get_entry(key, ("laps", "telemetry"))
+
+        session = entry.session
+        lap = self._derived(key, "lap_index", build_lap_index)[0].lap(driver, lap_number)
+        with entry.lock:
+            if lap is None or pd.isna(lap['LapStartTime']) or pd.isna(lap['Time']):
+                return pd.DataFrame()
+            if driver_number not in session.car_data or driver_number not in session.pos_data:
+                return pd.DataFrame()
+
+            tel = merge_lap_telemetry(lap)
+            entry.slices[(driver, lap_number)] = tel
+            entry.extra_nbytes += int(tel.memory_usage(deep=True).sum())
+
+        self._count("lap_telemetry", False)
+        with self._lock:
+            self._evict()
+        return tel
+
+    def _cached_derived(self, entry, key, name):
+        with entry.lock:
+            table = entry.derived.get(name)
+            if table is None:
+                try:
+                    table = read_derived(key, name)
+                except Exception:
+                    logger.warning("Ignoring unreadable %s table for %s", name, key, exc_info=True)
+                if table is not None:
+                    entry.derived[name] = table
+                    entry.extra_nbytes += table_nbytes(table)
+        return table
+
+    def derived(self, key, name, build, tiers=("laps",)):
+        table, hit = self._derived(key, name, build, tiers)
+        self._count("derived", hit)
+        return table
+
+    def _derived(self, key, name, build, tiers=("laps",)):
+        # Returns the table and whether it was found rather than built. Memory,
+        # then the shared cache; a table found there needs none of the heavier tiers
+        entry, _ = self._get_entry(key, ("laps",))
+        table = self._cached_derived(entry, key, name)
+        if table is not None:
+            return table, True
+
+        cacheable = is_cacheable(entry.session)
+        # One worker on the host builds the table; the others wait and read it
+        with get_cache_backend().lock(derived_key(key, name)) if cacheable else nullcontext():
+            if cacheable:
+                table = self._cached_derived(entry, key, name)
+                if table is not None:
+                    return table, True
+            entry, _ = self._get_entry(key, tiers)
+            with entry.lock:
+                table = entry.derived.get(name)
+                if table is not None:
+                    return table, True
+                table = build(entry.session)
+                entry.derived[name] = table
+                entry.extra_nbytes += table_nbytes(table)
+                if cacheable:
+                    try:
+                        write_derived(table, key, name)
+                    except Exception:
+                        logger.warning("Could not cache %s table for %s", name, key, exc_info=True)
+
+        with self._lock:
+            self._evict()
+        return table, False
+
+    def _evict(self):
+        # Drop least recently used sessions, but always keep the newest one
+        while len(self._entries) > 1 and self.nbytes() > self.max_bytes:
+            key, _ = self._entries.popitem(last=False)
+            self.evictions += 1
+            # A lock someone holds or waits for still guards a load
+            key_lock = self._key_locks.get(key)
+            if key_lock is not None and key_lock[1] == 0:
+                del self._key_locks[key]
+
+    def nbytes(self):
+        return sum(entry.nbytes + entry.extra_nbytes for entry in self._entries.values())
+
+    # --- Memory per table of every session in the store, and what compaction saved ---
+    def memory_report(self):
+        with self._lock:
+            entries = list(self._entries.items())
+        rows = []
+        for key, entry in entries:
+            session = " ".join(str(part) for part in key)
+            for row in session_memory_report(entry.session):
+                before, after = entry.compaction.get(row["Table"], (row["Bytes"], row["Bytes"]))
+                rows.append({"Session": session, **row, "Saved": before - after})
+            rows.append({"Session": session, "Table": "derived and lap telemetry",
+                         "Rows": len(entry.derived) + len(entry.slices), "Bytes": entry.extra_nbytes, "Saved": 0})
+        return rows
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.requests["session"][0],
+                "misses": self.requests["session"][1],
+                "derived_hits": self.requests["derived"][0],
+                "derived_misses": self.requests["derived"][1],
+                "lap_telemetry_hits": self.requests["lap_telemetry"][0],
+                "lap_telemetry_misses": self.requests["lap_telemetry"][1],
+                "evictions": self.evictions,
+                "sessions": len(self._entries),
+                "bytes": self.nbytes(),
+                "max_bytes": self.max_bytes,
+            }
+
+@st.cache_resource
+def get_session_store():
+    return SessionStore(SESSION_CACHE_BYTES)
+
+@st.cache_resource
+def get_load_pool():
+    return ThreadPoolExecutor(max_workers=LOAD_WORKERS, thread_name_prefix="session-load")
+
+@st.cache_resource
+def get_prefetch_pool():
+    # Separate from the load pool, so warming never delays a view's own loads
+    return ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="session-prefetch")
+
+# --- Start loading a session on the shared pool; returns a Future of the session ---
+def submit_session_load(year, event, session_type, tiers=("laps",)):
+    store = get_session_store()
+    return get_load_pool().submit(store.get, (year, event, session_type), tiers)
 
 # --- Load session data with telemetry and weather ---
 def load_session(year, event, session_type):
-    session = fastf1.get_session(year, event, session_type)
-    session.load(telemetry=True, weather=True)
-    return session
+    with timed("load"):
+        return get_session_store().get((year, event, session_type), ("laps", "weather", "telemetry"))
 
 # --- Load session data with no telemetry and weather
 def load_session_light(year , event , session_type):
-    session = fastf1.get_session(year, event, session_type)
-    session.load(telemetry=False, weather=False)
-    return session
+    with timed("load"):
+        return get_session_store().get((year, event, session_type), ("laps",))
 
 # --- Load session data with only weather ---
 def load_session_weather(year , event , session_type):
-    session = fastf1.get_session(year, event, session_type)
-    session.load(telemetry=False, weather=True)
-    return session
\ No newline at end of file
+    with timed("load"):
+        return get_session_store().get((year, event, session_type), ("laps", "weather"))
+
+# --- Telemetry for one driver on one lap, loaded and merged on its own ---
+def load_lap_telemetry(year, event, session_type, driver, lap_number):
+    with timed("telemetry"):
+        return get_session_store().lap_telemetry((year, event, session_type), driver, int(lap_number))
+
+# --- Table derived from a session, built once per session and kept with it ---
+def load_derived(year, event, session_type, name, build, tiers=("laps",)):
+    with timed(f"derived:{name}"):
+        return get_session_store().derived((year, event, session_type), name, build, tiers)
+
+# --- Token that changes whenever a running session is reloaded; 0 once it is finished ---
+def session_freshness(year, event, session_type):
+    return get_session_store().freshness((year, event, session_type))
+
+# --- Per-session lap index for constant-time driver/lap lookups ---
+def load_lap_index(year, event, session_type):
+    return load_derived(year, event, session_type, "lap_index", build_lap_index)
+
+# --- Background prefetch of the selected event and its neighbours ---
+class PrefetchBatch:
+
+    def __init__(self, selection):
+        self.selection = selection
+        self.futures = []
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        # Queued loads are dropped; running ones stop before their next tier
+        self.cancelled.set()
+        for future in self.futures:
+            future.cancel()
+
+def _prefetch(store, key, tiers, cancelled, in_memory):
+    if cancelled.is_set():
+        return
+    try:
+        if in_memory:
+            store.get(key, tiers)
+        else:
+            store.warm(key, tiers, cancelled)
+    except Exception as e:
+        logger.info("Prefetch of %s %s skipped: %s", key, tiers, e)
+
+def start_prefetch(year, event, events):
+    # Selected event: race and qualifying into memory, race telemetry to disk;
+    # previous/next event: race and qualifying laps to disk
+    store = get_session_store()
+    pool = get_prefetch_pool()
+    batch = PrefetchBatch((year, event))
+    plan = [
+        ((year, event, "Race"), ("laps", "weather"), True),
+        ((year, event, "Q"), ("laps",), True),
+        ((year, event, "Race"), ("laps", "telemetry"), False),
+    ]
+    if event in events:
+        position = events.index(event)
+        for neighbour in events[max(position - 1, 0):position] + events[position + 1:position + 2]:
+            plan.append(((year, neighbour, "Race"), ("laps", "weather"), False))
+            plan.append(((year, neighbour, "Q"), ("laps",), False))
+    for key, tiers, in_memory in plan:
+        batch.futures.append(pool.submit(_prefetch, store, key, tiers, batch.cancelled, in_memory))
+    return batch
@@ -0,0 +1,157 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Tyre degradation over whole stints, every driver at once: fuel-corrected
+# lap-time slope, minimum speed through the corners and time on full throttle,
+# each fitted against tyre age per stint.
+
+# Lap time gained per lap from burning fuel (~1.7 kg/lap at ~0.03 s/kg)
+FUEL_SECONDS_PER_LAP = 0.055
+# Laps slower than this share of the stint median are traffic, flags or mistakes
+SLOW_LAP_FACTOR = 1.07
+# Fewest representative laps a stint needs for a trend
+MIN_STINT_LAPS = 4
+# Metres either side of a corner apex searched for its minimum speed
+CORNER_WINDOW = 50.0
+# Throttle (%) counted as flat out
+FULL_THROTTLE = 99
+
+# --- Laps that tell something about the tyres: green flag, no pit, no outliers ---
+def representative_laps(session):
+    laps = session.laps
+    keep = (
+        laps["LapTime"].notna() & laps["Stint"].notna() & (laps["LapNumber"] > 1)
+        & laps["PitInTime"].isna() & laps["PitOutTime"].isna()
+        & (laps["TrackStatus"].astype(str) == "1")
+        & ~laps["Deleted"].fillna(False).astype(bool)
+    )
+    laps = laps[keep]
+    table = pd.DataFrame({
+        "Driver": laps["Driver"].to_numpy(),
+        "Stint": laps["Stint"].astype(int).to_numpy(),
+        "Compound": laps["Compound"].astype(object).fillna("UNKNOWN").to_numpy(),
+        "LapNumber": laps["LapNumber"].astype(int).to_numpy(),
+        "TyreLife": laps["TyreLife"].to_numpy(dtype=float),
+        "LapTimeSeconds": laps["LapTime"].dt.total_seconds().to_numpy(),
+    })
+    # Tyre age falls back to the lap count within the stint
+    stint_lap = table["LapNumber"] - table.groupby(["Driver", "Stint"])["LapNumber"].transform("min") + 1
+    table["TyreLife"] = table["TyreLife"].fillna(stint_lap)
+
+    median = table.groupby(["Driver", "Stint"])["LapTimeSeconds"].transform("median")
+    table = table[table["LapTimeSeconds"] <= median * SLOW_LAP_FACTOR]
+
+    # Remove the fuel effect: every lap is timed as if run on the final lap's fuel load
+    last_lap = int(laps["LapNumber"].max()) if len(laps) else 0
+    table["FuelCorrected"] = table["LapTimeSeconds"] - FUEL_SECONDS_PER_LAP * (last_lap - table["LapNumber"])
+    return table.reset_index(drop=True)
+
+# --- Corner apex distances: circuit info, else the slow points of the fastest lap ---
+def corner_distances(session, samples, laps):
+    try:
+        corners = session.get_circuit_info().corners["Distance"].to_numpy(dtype=float)
+        if len(corners):
+            return np.sort(corners)
+    except Exception as e:
+        logger.info("No circuit info for corner positions, using speed minima: %s", e)
+
+    if laps.empty or samples.empty:
+        return np.empty(0)
+    fastest = laps.loc[laps["LapTimeSeconds"].idxmin()]
+    lap = samples[(samples["Driver"] == fastest["Driver"]) & (samples["LapNumber"] == fastest["LapNumber"])]
+    speed = lap["Speed"].reset_index(drop=True)
+    # Local minima within ~10 samples either side
+    is_min = (speed == speed.rolling(21, center=True, min_periods=1).min()) & (speed < speed.median())
+    apexes = lap["Distance"].to_numpy()[is_min.to_numpy()]
+    # One apex per corner
+    return apexes[np.r_[True, np.diff(apexes) > 2 * CORNER_WINDOW]] if len(apexes) else apexes
+
+# --- Car samples of one driver, tagged with their lap and distance into the lap ---
+def lap_samples(car, driver_laps):
+    driver_laps = driver_laps[driver_laps["LapStartTime"].notna() & driver_laps["Time"].notna()]
+    driver_laps = driver_laps.sort_values("LapStartTime")
+    starts = driver_laps["LapStartTime"].dt.total_seconds().to_numpy()
+    ends = driver_laps["Time"].dt.total_seconds().to_numpy()
+    numbers = driver_laps["LapNumber"].astype(int).to_numpy()
+
+    t = car["SessionTime"].dt.total_seconds().to_numpy()
+    lap = np.searchsorted(starts, t, side="right") - 1
+    inside = lap >= 0
+    inside[inside] = t[inside] <= ends[lap[inside]]
+    if not inside.any():
+        return pd.DataFrame({"LapNumber": np.empty(0, dtype=int), "Distance": np.empty(0),
+                             "Speed": np.empty(0), "Throttle": np.empty(0)})
+    t, lap = t[inside], lap[inside]
+    speed = car["Speed"].to_numpy(dtype=float)[inside]
+
+    # Distance integrated from speed, restarting at every lap
+    dt = np.diff(t, prepend=t[:1])
+    dt[np.r_[True, lap[1:] != lap[:-1]]] = 0
+    distance = pd.Series(speed / 3.6 * dt).groupby(lap).cumsum().to_numpy()
+    return pd.DataFrame({
+        "LapNumber": numbers[lap],
+        "Distance": distance,
+        "Speed": speed,
+        "Throttle": car["Throttle"].to_numpy(dtype=float)[inside],
+    })
+
+# --- Per lap: mean of the corner minimum speeds and share of the lap on full throttle ---
+def lap_telemetry_metrics(session, representative):
+    laps = session.laps
+    parts = []
+    for driver_number, car in session.car_data.items():
+        driver_laps = laps[laps["DriverNumber"] == driver_number]
+        if driver_laps.empty or car.empty:
+            continue
+        samples = lap_samples(car, driver_laps)
+        samples["Driver"] = driver_laps["Driver"].iloc[0]
+        parts.append(samples)
+    if not parts:
+        return pd.DataFrame({"Driver": pd.Series(dtype=object), "LapNumber": np.empty(0, dtype=int),
+                             "FullThrottle": np.empty(0), "MinCornerSpeed": np.empty(0)})
+    samples = pd.concat(parts, ignore_index=True)
+
+    samples["FullThrottle"] = (samples["Throttle"] >= FULL_THROTTLE) * 100.0
+    metrics = samples.groupby(["Driver", "LapNumber"], observed=True)["FullThrottle"].mean().to_frame()
+
+    corners = corner_distances(session, samples, representative)
+    if len(corners):
+        # Nearest apex of every sample, kept if within the corner window
+        corner = np.searchsorted((corners[1:] + corners[:-1]) / 2, samples["Distance"].to_numpy())
+        near = np.abs(samples["Distance"].to_numpy() - corners[corner]) <= CORNER_WINDOW
+        in_corner = samples[near].assign(Corner=corner[near])
+        corner_min = in_corner.groupby(["Driver", "LapNumber", "Corner"], observed=True)["Speed"].min()
+        metrics["MinCornerSpeed"] = corner_min.groupby(level=["Driver", "LapNumber"]).mean()
+    else:
+        metrics["MinCornerSpeed"] = np.nan
+    return metrics.reset_index()
+
+# --- Least-squares slope of y against x for every group, in one groupby ---
+def group_slopes(df, keys, x, y):
+    data = df[keys + [x, y]].dropna()
+    sums = data.assign(xy=data[x] * data[y], xx=data[x] ** 2).groupby(keys, observed=True).agg(
+        n=(x, "size"), sx=(x, "sum"), sy=(y, "sum"), sxy=("xy", "sum"), sxx=("xx", "sum"))
+    denominator = sums["n"] * sums["sxx"] - sums["sx"] ** 2
+    slope = (sums["n"] * sums["sxy"] - sums["sx"] * sums["sy"]) / denominator.where(denominator > 0)
+    return slope.where(sums["n"] >= MIN_STINT_LAPS)
+
+# --- Per-session degradation tables: representative laps and one row per stint ---
+def build_degradation(session):
+    laps = representative_laps(session)
+    metrics = lap_telemetry_metrics(session, laps)
+    laps = laps.merge(metrics, on=["Driver", "LapNumber"], how="left")
+
+    keys = ["Driver", "Stint"]
+    stints = laps.groupby(keys, observed=True).agg(
+        Compound=("Compound", "first"), Laps=("LapNumber", "size"),
+        FirstLap=("LapNumber", "min"), LastLap=("LapNumber", "max"))
+    # Seconds per lap of tyre age; km/h lost per lap at the corners; % of lap flat out per lap
+    stints["Degradation"] = group_slopes(laps, keys, "TyreLife", "FuelCorrected")
+    stints["CornerSpeedTrend"] = group_slopes(laps, keys, "TyreLife", "MinCornerSpeed")
+    stints["ThrottleTrend"] = group_slopes(laps, keys, "TyreLife", "FullThrottle")
+    stints = stints.reset_index().sort_values("Degradation", na_position="last").reset_index(drop=True)
+    return {"laps": laps, "stints": stints}
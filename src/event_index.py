@@ -0,0 +1,138 @@
+import datetime
+import json
+import logging
+import os
+import threading
+
+import fastf1
+import pandas as pd
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+# Local index of the race calendar: year -> events with round, date and
+# session types. Past seasons are fetched once; only the current season is
+# refreshed, and only when its copy is older than EVENT_INDEX_TTL_HOURS.
+
+# Where the index is kept
+EVENT_INDEX_PATH = os.environ.get(
+    "F1_EVENT_INDEX",
+    os.path.join(
+        os.environ.get("F1_DASHBOARD_CACHE",
+                       os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "cache")),
+        "events.json",
+    ),
+)
+
+# Age after which the current season is fetched again
+EVENT_INDEX_TTL_HOURS = float(os.environ.get("F1_EVENT_INDEX_TTL_HOURS", "12"))
+
+# "fastf1" (default) or the path of a JSON file in the index format, used
+# instead of the network in air-gapped setups and tests
+EVENT_SOURCE = os.environ.get("F1_EVENT_SOURCE", "fastf1")
+
+# --- Sources: anything with fetch(year) -> list of event dicts ---
+class FastF1EventSource:
+
+    def fetch(self, year):
+        schedule = fastf1.get_event_schedule(year, include_testing=False)
+        events = []
+        for _, row in schedule.iterrows():
+            sessions = []
+            for n in range(1, 6):
+                name = row.get(f"Session{n}")
+                if isinstance(name, str) and name and name != "None":
+                    date = row.get(f"Session{n}DateUtc")
+                    sessions.append({"Name": name, "DateUtc": None if pd.isna(date) else pd.Timestamp(date).isoformat()})
+            events.append({
+                "RoundNumber": int(row["RoundNumber"]),
+                "EventName": row["EventName"],
+                "Country": row.get("Country"),
+                "Location": row.get("Location"),
+                "EventDate": None if pd.isna(row["EventDate"]) else pd.Timestamp(row["EventDate"]).isoformat(),
+                "EventFormat": row.get("EventFormat"),
+                "Sessions": sessions,
+            })
+        return events
+
+class JsonEventSource:
+
+    def __init__(self, path):
+        self.path = path
+
+    def fetch(self, year):
+        with open(self.path) as f:
+            data = json.load(f)
+        season = data.get("years", data).get(str(year))
+        if season is None:
+            raise KeyError(f"No events for {year} in {self.path}")
+        return season["events"] if isinstance(season, dict) else season
+
+def default_source():
+    if EVENT_SOURCE == "fastf1":
+        return FastF1EventSource()
+    return JsonEventSource(EVENT_SOURCE)
+
+# --- Persistent index, refreshed per season ---
+class EventIndex:
+
+    def __init__(self, path=EVENT_INDEX_PATH, source=None, ttl_hours=EVENT_INDEX_TTL_HOURS):
+        self.path = path
+        self.source = source or default_source()
+        self.ttl = datetime.timedelta(hours=ttl_hours)
+        self._lock = threading.Lock()
+        self._years = None
+
+    def _load(self):
+        if self._years is None:
+            try:
+                with open(self.path) as f:
+                    self._years = json.load(f).get("years", {})
+            except (OSError, ValueError):
+                self._years = {}
+        return self._years
+
+    def _save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"years": self._years}, f, indent=1, default=str)
+        os.replace(tmp_path, self.path)
+
+    def _is_fresh(self, season, year, now):
+        # A season fetched after it ended never changes; anything else is re-read after the TTL
+        fetched = datetime.datetime.fromisoformat(season["fetched"])
+        return fetched.year > year or now - fetched < self.ttl
+
+    def events(self, year):
+        year = int(year)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        with self._lock:
+            years = self._load()
+            season = years.get(str(year))
+            if season is not None and self._is_fresh(season, year, now):
+                return season["events"]
+            try:
+                events = self.source.fetch(year)
+            except Exception as e:
+                if season is None:
+                    raise
+                logger.warning("Event schedule refresh for %s failed, using the stored one: %s", year, e)
+                return season["events"]
+            years[str(year)] = {"fetched": now.isoformat(), "events": events}
+            self._save()
+            return events
+
+    def event_names(self, year):
+        return [event["EventName"] for event in sorted(self.events(year), key=lambda event: event["RoundNumber"])
+                if event["RoundNumber"] > 0]
+
+    def session_types(self, year, event_name):
+        for event in self.events(year):
+            if event["EventName"] == event_name:
+                return [session["Name"] for session in event["Sessions"]]
+        return []
+
+@st.cache_resource
+def get_event_index():
+    return EventIndex()
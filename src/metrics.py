@@ -0,0 +1,205 @@
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+import altair as alt
+import streamlit as st
+from streamlit.dataframe_util import convert_anything_to_arrow_bytes
+
+try:
+    # Altair's data transformer is global; share Streamlit's lock around it
+    from streamlit.elements.vega_charts import _altair_globals_lock as _altair_lock
+except ImportError:
+    _altair_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+# Where render time goes, per view: loads, data prep, chart spec, serialization
+# and render. Process-wide counters, shown in the sidebar performance panel and
+# exported as JSON log lines and Prometheus text.
+
+# Measure chart payloads for every run (costs one extra serialization per chart);
+# otherwise only while the performance panel is open
+ENABLED = os.environ.get("F1_METRICS", "0") == "1"
+# One JSON log line per timed stage
+LOG_STAGES = os.environ.get("F1_METRICS_LOG", "0") == "1"
+# Prometheus text file rewritten after every run, for a textfile collector
+PROMETHEUS_FILE = os.environ.get("F1_METRICS_FILE")
+
+_lock = threading.Lock()
+_stages = {}  # (view, stage) -> [count, total seconds, max seconds]
+_payloads = {}  # view -> [count, total bytes, last bytes]
+_cache = {}  # session store counters
+_recent = deque(maxlen=100)  # last timed stages, newest last
+
+# View being rendered, and the time its sub-stages took so far
+_current_view = contextvars.ContextVar("current_view", default=None)
+_sub_seconds = contextvars.ContextVar("sub_seconds", default=None)
+
+def record(view, stage, seconds):
+    with _lock:
+        totals = _stages.setdefault((view, stage), [0, 0.0, 0.0])
+        totals[0] += 1
+        totals[1] += seconds
+        totals[2] = max(totals[2], seconds)
+        _recent.append({"time": time.time(), "view": view, "stage": stage, "seconds": seconds})
+    if LOG_STAGES:
+        logger.info(json.dumps({"event": "stage", "view": view, "stage": stage, "seconds": round(seconds, 6)}))
+
+# --- Time a stage of the current view ---
+@contextmanager
+def timed(stage):
+    view = _current_view.get() or "app"
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        record(view, stage, seconds)
+        sub_seconds = _sub_seconds.get()
+        if sub_seconds is not None:
+            sub_seconds[0] += seconds
+
+# --- Time a whole view; what its timed stages do not cover is data prep ---
+def view(name):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            view_token = _current_view.set(name)
+            sub_token = _sub_seconds.set([0.0])
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                total = time.perf_counter() - start
+                record(name, "total", total)
+                record(name, "prep", max(total - _sub_seconds.get()[0], 0.0))
+                _current_view.reset(view_token)
+                _sub_seconds.reset(sub_token)
+        return wrapper
+    return decorator
+
+def measuring():
+    try:
+        return ENABLED or bool(st.session_state.get("perf_panel", False))
+    except Exception:
+        return ENABLED
+
+# --- A chart as Streamlit sends it: datasets as Arrow IPC, the spec as JSON without them ---
+def _arrow_dataset(data, datasets):
+    data_bytes = convert_anything_to_arrow_bytes(data)
+    name = hashlib.md5(data_bytes).hexdigest()
+    datasets[name] = data_bytes
+    return {"name": name}
+
+alt.data_transformers.register("arrow_payload", _arrow_dataset)
+
+def chart_spec(chart):
+    # Returns the spec without inline data, and dataset name -> Arrow bytes
+    datasets = {}
+    with _altair_lock, alt.data_transformers.enable("arrow_payload", datasets=datasets):
+        spec = chart.to_dict()
+    spec.pop("datasets", None)
+    return spec, datasets
+
+def chart_bytes(chart):
+    spec, datasets = chart_spec(chart)
+    return len(json.dumps(spec).encode()) + sum(len(data) for data in datasets.values())
+
+# --- Spec build and serialization time and bytes of a chart ---
+def chart_payload(chart):
+    if not measuring():
+        return None
+    with timed("spec"):
+        # Datasets are converted to Arrow while the spec is built, as in st.altair_chart
+        spec, datasets = chart_spec(chart)
+    with timed("serialize"):
+        nbytes = len(json.dumps(spec).encode()) + sum(len(data) for data in datasets.values())
+    view_name = _current_view.get() or "app"
+    with _lock:
+        totals = _payloads.setdefault(view_name, [0, 0, 0])
+        totals[0] += 1
+        totals[1] += nbytes
+        totals[2] = nbytes
+    if LOG_STAGES:
+        logger.info(json.dumps({"event": "payload", "view": view_name, "bytes": nbytes}))
+    return nbytes
+
+def record_cache(stats):
+    with _lock:
+        _cache.update(stats)
+
+def peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        # Windows: not available without extra dependencies
+        return 0
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+# --- Exports ---
+def snapshot():
+    with _lock:
+        return {
+            "stages": [
+                {"view": view_name, "stage": stage, "count": count, "total_seconds": total, "max_seconds": peak}
+                for (view_name, stage), (count, total, peak) in sorted(_stages.items())
+            ],
+            "payloads": [
+                {"view": view_name, "count": count, "total_bytes": total, "last_bytes": last}
+                for view_name, (count, total, last) in sorted(_payloads.items())
+            ],
+            "cache": dict(_cache),
+            "recent": list(_recent),
+            "peak_rss_bytes": peak_rss_bytes(),
+        }
+
+def prometheus_text():
+    data = snapshot()
+    lines = [
+        "# HELP f1_stage_seconds Time spent per view and stage.",
+        "# TYPE f1_stage_seconds summary",
+    ]
+    for row in data["stages"]:
+        labels = f'view="{row["view"]}",stage="{row["stage"]}"'
+        lines.append(f"f1_stage_seconds_count{{{labels}}} {row['count']}")
+        lines.append(f"f1_stage_seconds_sum{{{labels}}} {row['total_seconds']:.6f}")
+    lines += ["# HELP f1_stage_seconds_max Slowest run per view and stage.", "# TYPE f1_stage_seconds_max gauge"]
+    for row in data["stages"]:
+        labels = f'view="{row["view"]}",stage="{row["stage"]}"'
+        lines.append(f"f1_stage_seconds_max{{{labels}}} {row['max_seconds']:.6f}")
+    lines += ["# HELP f1_chart_payload_bytes Chart spec JSON plus Arrow datasets per view.",
+              "# TYPE f1_chart_payload_bytes summary"]
+    for row in data["payloads"]:
+        lines.append(f'f1_chart_payload_bytes_count{{view="{row["view"]}"}} {row["count"]}')
+        lines.append(f'f1_chart_payload_bytes_sum{{view="{row["view"]}"}} {row["total_bytes"]}')
+    for name, kind in (("hits", "counter"), ("misses", "counter"), ("derived_hits", "counter"),
+                       ("derived_misses", "counter"), ("lap_telemetry_hits", "counter"),
+                       ("lap_telemetry_misses", "counter"), ("evictions", "counter"), ("sessions", "gauge"),
+                       ("bytes", "gauge")):
+        if name in data["cache"]:
+            # Sessions, derived tables and lap telemetry are counted apart
+            cache, _, stat = name.rpartition("_")
+            metric = f"f1_{cache or 'session'}_cache_{stat}" + ("_total" if kind == "counter" else "")
+            lines += [f"# TYPE {metric} {kind}", f"{metric} {data['cache'][name]}"]
+    lines += ["# TYPE f1_peak_rss_bytes gauge", f"f1_peak_rss_bytes {data['peak_rss_bytes']}"]
+    return "\n".join(lines) + "\n"
+
+def write_prometheus(path=None):
+    path = path or PROMETHEUS_FILE
+    if not path:
+        return
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(prometheus_text())
+    os.replace(tmp_path, path)
@@ -0,0 +1,198 @@
+import numpy as np
+import pandas as pd
+
+# Per-session tables derived from a loaded FastF1 session. Builders take the
+# session and return a compact table; data_loader.load_derived caches them.
+
+# --- Vectorized time formatting ---
+def _millis(td):
+    return (pd.Series(td, dtype="timedelta64[ns]").dt.total_seconds() * 1000).round().astype("Int64")
+
+def format_race_time(td):
+    # HH:MM:SS.mmm
+    ms = _millis(td)
+    text = ((ms // 3600000).astype(str).str.zfill(2) + ":"
+            + (ms // 60000 % 60).astype(str).str.zfill(2) + ":"
+            + (ms // 1000 % 60).astype(str).str.zfill(2) + "."
+            + (ms % 1000).astype(str).str.zfill(3))
+    return text.where(ms.notna(), "N/A")
+
+def format_gap(td):
+    # +S.mmms
+    ms = _millis(td)
+    text = "+" + (ms // 1000).astype(str) + "." + (ms % 1000).astype(str).str.zfill(3) + "s"
+    return text.where(ms.notna(), "N/A")
+
+def format_lap_time(td):
+    # M:SS.mmm
+    ms = _millis(td)
+    text = ((ms // 60000).astype(str) + ":"
+            + (ms // 1000 % 60).astype(str).str.zfill(2) + "."
+            + (ms % 1000).astype(str).str.zfill(3))
+    return text.where(ms.notna(), "N/A")
+
+# --- Results grid: positions, gaps, classification, names and fastest laps ---
+def build_results(session):
+    results = session.results
+    table = pd.DataFrame({
+        "Abbreviation": results["Abbreviation"].to_numpy(),
+        "FullName": results["FullName"].to_numpy(),
+        "TeamName": results["TeamName"].to_numpy(),
+        "Position": results["Position"].to_numpy(dtype=float),
+        "Status": results["Status"].to_numpy(),
+        "Time": results["Time"].to_numpy(),
+        # Qualifying: best time of the last part the driver reached
+        "QualiTime": results[["Q3", "Q2", "Q1"]].apply(pd.to_timedelta).bfill(axis=1).iloc[:, 0].to_numpy(),
+    })
+
+    # Officially classified drivers have a numeric ClassifiedPosition; sessions
+    # without a classification count everyone with a position as classified
+    classified = pd.to_numeric(results["ClassifiedPosition"], errors="coerce").notna().to_numpy()
+    if not classified.any():
+        classified = table["Position"].notna().to_numpy()
+    table["Classified"] = classified
+
+    # FastF1 gives the winner's total time and the gap for everyone else
+    winner_time = table.loc[table["Position"] == 1, "Time"]
+    winner_time = winner_time.iloc[0] if len(winner_time) else pd.NaT
+    table["Gap"] = table["Time"].where(table["Time"] < winner_time, table["Time"] - winner_time)
+
+    # Fastest lap per driver
+    laps = session.laps
+    timed = laps.loc[laps["LapTime"].notna(), ["Driver", "LapTime", "LapNumber"]]
+    fastest = timed.sort_values("LapTime").drop_duplicates("Driver").rename(
+        columns={"Driver": "Abbreviation", "LapTime": "FastestLapTime", "LapNumber": "FastestLapNumber"})
+    table = table.merge(fastest, on="Abbreviation", how="left")
+
+    table = table.sort_values(["Classified", "Position"], ascending=[False, True],
+                              na_position="last").reset_index(drop=True)
+
+    # Display strings
+    winner = table["Classified"] & (table["Position"] == 1)
+    has_gap = table["Classified"] & table["Gap"].notna()
+    table["PositionText"] = np.where(table["Classified"],
+                                     table["Position"].astype("Int64").astype(str), "DNF")
+    table["TimeText"] = np.select(
+        [winner, has_gap, table["Classified"]],
+        [format_race_time(table["Time"]), format_gap(table["Gap"]), table["Status"].fillna("N/A")],
+        default="DNF",
+    )
+    return table
+
+# --- Stints: compound and real first/last lap of every stint of every driver ---
+def build_stints(session):
+    laps = session.laps
+    laps = laps[laps["Stint"].notna() & laps["LapNumber"].notna()]
+    stints = (
+        laps.assign(Compound=laps["Compound"].astype(object).fillna("UNKNOWN"))
+        .groupby(["Driver", "Stint"], observed=True)
+        .agg(Compound=("Compound", "first"),
+             FirstLap=("LapNumber", "min"),
+             LastLap=("LapNumber", "max"))
+        .reset_index()
+    )
+    stints["Stint"] = stints["Stint"].astype(int)
+    stints["FirstLap"] = stints["FirstLap"].astype(int)
+    stints["LastLap"] = stints["LastLap"].astype(int)
+    return stints
+
+# --- Lap times: one column per driver and lap number as index, seconds and display text ---
+def build_lap_times(session):
+    laps = session.laps
+    laps = laps[laps["LapNumber"].notna() & (laps["LapNumber"] > 0)]
+    laps = laps.drop_duplicates(["Driver", "LapNumber"])
+    long = pd.DataFrame({
+        "Driver": laps["Driver"].to_numpy(),
+        "LapNumber": laps["LapNumber"].astype(int).to_numpy(),
+        "LapTimeSeconds": laps["LapTime"].dt.total_seconds().to_numpy(),
+        "LapTimeFormatted": format_lap_time(laps["LapTime"]).to_numpy(),
+    })
+
+    # Every lap up to the last one, drivers in classification order
+    with_laps = set(long["Driver"])
+    drivers = [abbr for abbr in session.results["Abbreviation"] if abbr in with_laps]
+    drivers += [driver for driver in long["Driver"].unique() if driver not in drivers]
+    last_lap = int(long["LapNumber"].max()) if len(long) else 0
+    lap_range = pd.RangeIndex(1, last_lap + 1, name="LapNumber")
+
+    seconds = long.pivot(index="LapNumber", columns="Driver", values="LapTimeSeconds")
+    text = long.pivot(index="LapNumber", columns="Driver", values="LapTimeFormatted")
+    return pd.concat({
+        "LapTimeSeconds": seconds.reindex(index=lap_range, columns=drivers).astype(float),
+        "LapTimeFormatted": text.reindex(index=lap_range, columns=drivers).fillna("N/A"),
+    }, axis=1)
+
+# --- Weather per lap: as-of join of lap start/end against the weather stream ---
+def build_lap_weather(session):
+    laps = session.laps[["Driver", "LapNumber", "LapStartTime", "Time"]]
+    laps = laps[laps["LapNumber"].notna() & laps["Time"].notna()].copy()
+    laps["LapStartTime"] = laps["LapStartTime"].fillna(laps["Time"])
+
+    weather = session.weather_data[["Time", "Rainfall", "TrackTemp", "AirTemp"]]
+    weather = weather.dropna(subset=["Time"]).sort_values("Time").rename(columns={"Time": "WeatherTime"})
+    weather["Rainfall"] = weather["Rainfall"].astype("boolean").fillna(False).astype(bool)
+    # Running count of rainy samples: a lap saw rain if the count grew while it ran
+    weather["RainSamples"] = weather["Rainfall"].cumsum()
+
+    at_end = pd.merge_asof(laps.sort_values("Time"), weather,
+                           left_on="Time", right_on="WeatherTime", direction="backward")
+    at_start = pd.merge_asof(laps.sort_values("LapStartTime"),
+                             weather[["WeatherTime", "Rainfall", "RainSamples"]],
+                             left_on="LapStartTime", right_on="WeatherTime", direction="backward")
+    at_start = at_start.set_index(["Driver", "LapNumber"])
+    at_end = at_end.set_index(["Driver", "LapNumber"])
+    # Laps starting before the first weather sample have no reading: nullable, then dry
+    start_rain = at_start["Rainfall"].reindex(at_end.index).astype("boolean").fillna(False).astype(bool)
+    start_samples = at_start["RainSamples"].reindex(at_end.index).fillna(0)
+
+    lap_weather = pd.DataFrame({
+        "Rainfall": start_rain | (at_end["RainSamples"].fillna(0) > start_samples),
+        "TrackTemp": at_end["TrackTemp"],
+        "AirTemp": at_end["AirTemp"],
+    }).reset_index()
+    lap_weather["LapNumber"] = lap_weather["LapNumber"].astype(int)
+    return lap_weather.sort_values(["Driver", "LapNumber"]).reset_index(drop=True)
+
+# --- Lookup index over the laps: (driver, lap) -> lap, stints, fastest lap, final position ---
+class LapIndex:
+
+    def __init__(self, session):
+        # Positions into session.laps rather than a copy of the laps, which would
+        # count against the session store's budget a second time
+        self.session = session
+        positions = np.flatnonzero(session.laps["LapNumber"].notna().to_numpy())
+        laps = session.laps.iloc[positions]
+        lap_numbers = laps["LapNumber"].astype(int)
+        self.rows = dict(zip(zip(laps["Driver"], lap_numbers), positions.tolist()))
+        self.lap_numbers = sorted(lap_numbers.unique().tolist())
+
+        # Drivers in classification order, as in session.drivers
+        self.drivers = [abbr for abbr in session.results["Abbreviation"] if pd.notna(abbr)]
+
+        per_driver = laps.sort_values("LapNumber").groupby("Driver", observed=True).agg(
+            Team=("Team", "first"), FinalPosition=("Position", "last"))
+        self.teams = per_driver["Team"].to_dict()
+        self.final_position = per_driver["FinalPosition"].to_dict()
+        # Drivers by their last known race position, drivers without one last
+        self.order = per_driver.sort_values("FinalPosition", na_position="last").index.tolist()
+
+        timed = laps[laps["LapTime"].notna()].sort_values("LapTime").drop_duplicates("Driver")
+        self.fastest = dict(zip(timed["Driver"], timed["LapNumber"].astype(int)))
+
+        # driver -> [(stint, compound, first lap, last lap), ...]
+        self.stints = {}
+        for row in build_stints(session).itertuples(index=False):
+            self.stints.setdefault(row.Driver, []).append((row.Stint, row.Compound, row.FirstLap, row.LastLap))
+
+    def lap(self, driver, lap_number):
+        row = self.rows.get((driver, int(lap_number)))
+        return None if row is None else self.session.laps.iloc[row]
+
+    def stint(self, driver, stint):
+        for entry in self.stints.get(driver, []):
+            if entry[0] == stint:
+                return entry
+        return None
+
+def build_lap_index(session):
+    return LapIndex(session)
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+# Telemetry laps compared point by point: every lap is resampled onto one
+# distance grid, so time and speed can be subtracted metre by metre.
+
+# Spacing of the shared distance grid, in metres
+GRID_STEP = 1.0
+
+# --- Distance, elapsed seconds and speed of one lap as arrays ---
+def lap_arrays(tel):
+    tel = tel[tel["Distance"].notna() & tel["Time"].notna() & tel["Speed"].notna()]
+    # Distance is integrated from speed; keep it non-decreasing for np.interp
+    distance = np.maximum.accumulate(tel["Distance"].to_numpy(dtype=float))
+    seconds = tel["Time"].dt.total_seconds().to_numpy(dtype=float)
+    speed = tel["Speed"].to_numpy(dtype=float)
+    return distance, seconds, speed
+
+# --- Grid over the distance span every lap covers ---
+def distance_grid(distances, step=GRID_STEP):
+    start = max(max(distance[0], 0.0) for distance in distances)
+    end = min(distance[-1] for distance in distances)
+    if end <= start:
+        return np.empty(0)
+    return np.arange(start, end, step)
+
+# --- One reference lap against N laps in one call ---
+def align_laps(reference, others, step=GRID_STEP):
+    # Returns the grid and, per other lap (rows), the time delta in seconds
+    # (positive: behind the reference) and the speed delta in km/h
+    laps = [lap_arrays(tel) for tel in [reference, *others]]
+    if any(len(distance) < 2 for distance, _, _ in laps):
+        return np.empty(0), np.empty((len(others), 0)), np.empty((len(others), 0))
+    grid = distance_grid([distance for distance, _, _ in laps], step)
+
+    times = np.vstack([np.interp(grid, distance, seconds) for distance, seconds, _ in laps])
+    speeds = np.vstack([np.interp(grid, distance, speed) for distance, _, speed in laps])
+    # Time elapsed since the start of the grid, so every lap starts level
+    if len(grid):
+        times -= times[:, :1]
+    return grid, times[1:] - times[0], speeds[1:] - speeds[0]
+
+# --- Long table of the deltas for charting, one label per compared lap ---
+def delta_table(reference, others, labels, step=GRID_STEP):
+    grid, time_delta, speed_delta = align_laps(reference, others, step)
+    return pd.DataFrame({
+        "Distance": np.tile(grid, len(labels)),
+        "Driver": np.repeat(labels, len(grid)),
+        "Delta": time_delta.ravel(),
+        "SpeedDelta": speed_delta.ravel(),
+    })
@@ -0,0 +1,297 @@
+import functools
+import os
+
+import fastf1
+import pandas as pd
+import streamlit as st
+
+from data_loader import (load_derived , load_lap_index , load_lap_telemetry , load_session_light ,
+                         session_freshness , submit_session_load)
+from session_tables import build_lap_times , build_lap_weather , build_results , build_stints , format_race_time
+from chart_data import DELTA_CHANNELS , DELTA_DECIMALS , TELEMETRY_DECIMALS , chart_frame , shared_data , zoom_and_downsample
+from telemetry_analysis import delta_table
+from degradation import build_degradation
+
+# Data prep of every view, without widgets: session key and filter values in,
+# compact chart frames, colours and values out. Memoized process-wide on the
+# arguments, so users looking at the same session with the same filters share
+# one computation. Filters are passed as tuples, so they hash as cache keys.
+# Every function takes the session key first; results of a running session are
+# also keyed on when it was loaded, so they are rebuilt when it is reloaded.
+
+# Prepared results kept per function; each is a small chart frame or a few values
+PREPARED_ENTRIES = int(os.environ.get("F1_PREPARED_ENTRIES", "128"))
+
+def prepared(func):
+    # Wrapped so the cache keeps func's name and source, and stays one cache per function
+    @functools.wraps(func)
+    def cached(freshness, *args):
+        return func(*args)
+    cached = st.cache_data(show_spinner=False, max_entries=PREPARED_ENTRIES)(cached)
+
+    @functools.wraps(func)
+    def wrapper(year, event, session_type, *args):
+        return cached(session_freshness(year, event, session_type), year, event, session_type, *args)
+    return wrapper
+
+def driver_color(driver, session):
+    return fastf1.plotting.get_driver_style(identifier=driver, style=['color'], session=session)['color']
+
+# --- Race overview: podium, fastest lap and results table ---
+@prepared
+def prepare_race_overview(year, event, session_type):
+    # Qualifying loads in the background while the race is prepared, for the pole card
+    submit_session_load(year, event, 'Q')
+    session = load_session_light(year, event, session_type)
+    results = load_derived(year, event, session_type, "results", build_results)
+
+    def card(row):
+        return {
+            "FullName": row['FullName'],
+            "TeamName": row['TeamName'],
+            "TimeText": row['TimeText'],
+            "Color": fastf1.plotting.get_team_color(row['TeamName'], session=session),
+        }
+
+    fastest_lap = results.loc[results['FastestLapTime'].idxmin()]
+    fastest = card(fastest_lap)
+    fastest["Time"] = format_race_time([fastest_lap['FastestLapTime']]).iloc[0]
+    fastest["LapNumber"] = int(fastest_lap['FastestLapNumber'])
+
+    table = results[['PositionText', 'FullName', 'TeamName', 'TimeText']].rename(columns={
+        'PositionText': 'Position',
+        'FullName': 'Driver',
+        'TeamName': 'Team',
+        'TimeText': 'Time'
+    })
+    return {
+        "caption": f"{session.event['EventName']} - {session.event['EventDate'].strftime('%Y-%m-%d')}",
+        "podium": [card(results.iloc[position]) for position in range(3)],
+        "fastest": fastest,
+        "results": table,
+    }
+
+@prepared
+def prepare_pole(year, event, session_type):
+    # Pole position (P1 in qualifying); errors are raised, not cached, so the next run retries
+    quali_session = load_session_light(year, event, session_type)
+    pole_driver = load_derived(year, event, session_type, "results", build_results).iloc[0]
+    return {
+        "FullName": pole_driver['FullName'],
+        "Time": format_race_time([pole_driver['QualiTime']]).iloc[0],
+        "Color": fastf1.plotting.get_team_color(pole_driver['TeamName'], session=quali_session),
+    }
+
+# --- Race positions: lap-by-lap positions and track status of a lap range ---
+TRACK_STATUS_COLORS = {
+    "4": "#FFFF00AA",   # Safety Car → yellow
+    "5": "#FF0000AA",   # Red flag
+    "6": "#FFA500AA"    # VSC -> orange
+}
+TRACK_STATUS_LABELS = {
+    "4": "Safety Car",
+    "5": "Red Flag",
+    "6": "VSC"
+}
+
+@prepared
+def prepare_race_positions(year, event, session_type, drivers, lap_range):
+    session = load_session_light(year, event, session_type)
+    index = load_lap_index(year, event, session_type)
+    laps = session.laps
+
+    in_range = laps[(laps['LapNumber'] >= lap_range[0]) & (laps['LapNumber'] <= lap_range[1])]
+    selected = in_range[in_range['Driver'].isin(drivers)]
+    if selected.empty:
+        return None
+
+    # --- Driver colors & dashes: first driver per team solid, second dashed ---
+    drivers_in_range = set(selected['Driver'])
+    colors = {}
+    dashes = {}
+    team_driver_count = {}
+    for drv in drivers:
+        if drv not in drivers_in_range:
+            continue
+        colors[drv] = driver_color(drv, session)
+        team = index.teams[drv]
+        team_driver_count[team] = team_driver_count.get(team, 0) + 1
+        dashes[drv] = [0] if team_driver_count[team] == 1 else [5, 5]
+
+    # --- Laps under Safety Car, red flag or VSC ---
+    ts_df = in_range[['LapNumber', 'TrackStatus']].copy()
+    ts_df['TrackStatus'] = ts_df['TrackStatus'].astype(object).fillna('1').astype(str)
+    ts_df['LapNumber_plus1'] = ts_df['LapNumber'] + 1
+    ts_df = ts_df[ts_df['TrackStatus'] != '1'].copy()
+    ts_df['TrackStatusLabel'] = ts_df['TrackStatus'].map(TRACK_STATUS_LABELS)
+    # Legend entries only for the statuses in the range
+    existing_statuses = ts_df['TrackStatus'].unique()
+
+    return {
+        "positions": shared_data(selected, ['LapNumber', 'Position', 'Driver', 'Team']),
+        "lap_values": selected['LapNumber'].unique().tolist(),
+        "position_domain": [selected['Position'].max(), selected['Position'].min()],
+        "colors": colors,
+        "dashes": dashes,
+        "track_status": shared_data(ts_df, ['LapNumber', 'LapNumber_plus1', 'TrackStatusLabel']),
+        "status_domain": [TRACK_STATUS_LABELS[s] for s in existing_statuses if s in TRACK_STATUS_LABELS],
+        "status_range": [TRACK_STATUS_COLORS[s] for s in existing_statuses if s in TRACK_STATUS_COLORS],
+    }
+
+# --- Tyre strategies: stints clipped to a lap range, plus rainfall laps ---
+@prepared
+def prepare_tyre_strategies(year, event, session_type, drivers, lap_range):
+    session = load_session_light(year, event, session_type)
+    stints = load_derived(year, event, session_type, "stints", build_stints)
+    stints = stints[
+        stints['Driver'].isin(drivers) &
+        (stints['LastLap'] >= lap_range[0]) &
+        (stints['FirstLap'] <= lap_range[1])
+    ].copy()
+    if stints.empty:
+        return None
+
+    # Bars span from the first lap to the end of the last lap of each stint
+    stints['x_start'] = stints['FirstLap'].clip(lower=lap_range[0])
+    stints['EndLap'] = stints['LastLap'].clip(upper=lap_range[1])
+    stints['x_end'] = stints['EndLap'] + 1
+
+    # Keep the final-position order of the driver list
+    stint_drivers = set(stints['Driver'])
+    drivers_with_data = [driver for driver in drivers if driver in stint_drivers]
+    stints['Driver'] = pd.Categorical(stints['Driver'], categories=drivers_with_data, ordered=True)
+    compounds = stints['Compound'].unique().tolist()
+
+    # Per-lap conditions from an as-of join against the weather stream, cached per session
+    lap_weather = load_derived(year, event, session_type, "lap_weather", build_lap_weather,
+                               tiers=("laps", "weather"))
+    rain = lap_weather[
+        lap_weather['Rainfall'] &
+        (lap_weather['LapNumber'] >= lap_range[0]) &
+        (lap_weather['LapNumber'] <= lap_range[1])
+    ][['LapNumber']].drop_duplicates().copy()
+    if not rain.empty:
+        rain['LapEnd'] = rain['LapNumber'] + 1
+        # Padding drivers extend the rain bars above and below the field
+        rain['Driver'] = [['_top_padding'] + drivers_with_data + ['_bottom_padding']] * len(rain)
+        rain = chart_frame(rain.explode('Driver'), ['LapNumber', 'LapEnd', 'Driver'])
+
+    return {
+        "stints": chart_frame(stints, ['Driver', 'x_start', 'x_end', 'EndLap', 'Compound']),
+        "drivers": drivers_with_data,
+        "compounds": compounds,
+        "compound_colors": [fastf1.plotting.get_compound_color(comp, session=session) for comp in compounds],
+        "rain": None if rain.empty else rain,
+    }
+
+# --- Lap times: a column slice of the per-session pivot ---
+@prepared
+def prepare_lap_times(year, event, session_type, drivers):
+    session = load_session_light(year, event, session_type)
+    index = load_lap_index(year, event, session_type)
+    times = load_derived(year, event, session_type, "lap_times", build_lap_times)
+    drivers = [driver for driver in drivers if driver in times["LapTimeSeconds"].columns]
+    if not drivers:
+        return None
+
+    df = (
+        times.loc[:, pd.IndexSlice[:, drivers]]
+        .stack(level=1, future_stack=True)
+        .rename_axis(['LapNumber', 'Driver'])
+        .reset_index()
+    )
+    return {
+        "laps": chart_frame(df, ['LapNumber', 'LapTimeSeconds', 'LapTimeFormatted', 'Driver']),
+        "drivers": drivers,
+        "colors": [driver_color(driver, session) for driver in drivers],
+        "max_lap": index.lap_numbers[-1],
+    }
+
+# --- Telemetry comparison: two drivers on one lap, with the delta of the second to the first ---
+@prepared
+def prepare_telemetry_comparison(year, event, session_type, drivers, lap_number, zoom, width):
+    session = load_session_light(year, event, session_type)
+    dfs = []
+    for idx, driver in enumerate(drivers):
+        # Only this driver's lap is fetched and merged; cached per (driver, lap)
+        tel = load_lap_telemetry(year, event, session_type, driver, lap_number)
+        if tel.empty:
+            return {"missing": driver}
+        tel = tel[tel["Distance"] >= 0].copy()
+        tel["Driver"] = driver
+        # Line style: first driver solid, second driver dashed
+        tel["LineStyle"] = "solid" if idx == 0 else "dashed"
+        # Opacity: first driver slightly transparent (0.7), second driver full opacity (1.0)
+        tel["Opacity"] = 0.7 if idx == 0 else 1.0
+        dfs.append(tel)
+    df = pd.concat(dfs, ignore_index=True)
+
+    # --- Time and speed delta to the first driver, aligned on a shared distance grid ---
+    delta = delta_table(dfs[0], dfs[1:], list(drivers[1:]))
+
+    # --- Downsample for the browser; zooming re-samples the window at full resolution ---
+    lap_distance = df["Distance"].max()
+    df = zoom_and_downsample(df, zoom, by="Driver", width=width)
+    delta = zoom_and_downsample(delta, zoom, by=None, width=width, channels=DELTA_CHANNELS, max_distance=lap_distance)
+
+    return {
+        "telemetry": shared_data(df, ["Distance", "Speed", "Brake", "Throttle", "Driver", "LineStyle", "Opacity"],
+                                 TELEMETRY_DECIMALS),
+        "drivers": list(drivers),
+        "colors": [driver_color(driver, session) for driver in drivers],
+        "delta": None if delta.empty else chart_frame(delta, ["Distance", "Delta", "SpeedDelta"], DELTA_DECIMALS),
+    }
+
+# --- Tyre degradation: trends and curves of one driver's stints, ranking of the field ---
+@prepared
+def prepare_degradation(year, event, session_type, driver, stint):
+    # Whole-stint degradation of every driver, built once per session
+    degradation = load_derived(year, event, session_type, "degradation", build_degradation,
+                               tiers=("laps", "telemetry"))
+    stints = degradation["stints"]
+    stint_row = stints[(stints["Driver"] == driver) & (stints["Stint"] == stint)]
+    trends = {
+        column: float(stint_row[column].iloc[0]) if not stint_row.empty else float("nan")
+        for column in ("Degradation", "CornerSpeedTrend", "ThrottleTrend")
+    }
+
+    # Every stint of the driver against tyre age
+    driver_laps = degradation["laps"][degradation["laps"]["Driver"] == driver]
+    curves = None
+    if not driver_laps.empty:
+        driver_laps = driver_laps.assign(
+            StintLabel="Stint " + driver_laps["Stint"].astype(str) + " (" + driver_laps["Compound"].astype(str) + ")")
+        curves = chart_frame(driver_laps, ["LapNumber", "TyreLife", "FuelCorrected", "MinCornerSpeed",
+                                           "FullThrottle", "StintLabel"])
+    return {"trends": trends, "curves": curves}
+
+@prepared
+def prepare_degradation_ranking(year, event, session_type):
+    # Stints of every driver by fuel-corrected degradation
+    stints = load_derived(year, event, session_type, "degradation", build_degradation,
+                          tiers=("laps", "telemetry"))["stints"]
+    return stints.dropna(subset=["Degradation"])[
+        ["Driver", "Stint", "Compound", "Laps", "Degradation", "CornerSpeedTrend", "ThrottleTrend"]
+    ].rename(columns={
+        "Laps": "Laps used",
+        "Degradation": "Lap time (s/lap)",
+        "CornerSpeedTrend": "Corner min speed (km/h/lap)",
+        "ThrottleTrend": "Full throttle (%/lap)",
+    }).round(3)
+
+@prepared
+def prepare_stint_comparison(year, event, session_type, driver, lap_numbers, zoom, width):
+    # Telemetry of the first and last lap of a stint
+    dfs = []
+    for lap_number in lap_numbers:
+        tel = load_lap_telemetry(year, event, session_type, driver, lap_number).copy()
+        if tel.empty:
+            return None
+        tel["Lap"] = f"Lap {lap_number}"
+        dfs.append(tel)
+    df = pd.concat(dfs, ignore_index=True)
+    df = df[df["Distance"] >= 0].copy()  # remove negative distances
+
+    # --- Downsample for the browser; zooming re-samples the window at full resolution ---
+    df = zoom_and_downsample(df, zoom, by="Lap", width=width)
+    return shared_data(df, ["Distance", "Speed", "Brake", "Throttle", "Lap"], TELEMETRY_DECIMALS)
@@ -0,0 +1,141 @@
+import argparse
+import datetime
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import fastf1
+import pandas as pd
+
+from data_loader import (CACHE_BACKEND , CACHE_DIR , DERIVED_VERSION , SESSION_CACHE_BYTES , SessionStore ,
+                         is_cacheable , write_lap_slices)
+from degradation import build_degradation
+from event_index import get_event_index
+from session_tables import build_lap_times , build_lap_weather , build_results , build_stints
+
+# Fills the on-disk cache for whole seasons, so the dashboard never pays for a
+# cold load. Resumable: finished sessions are recorded in a manifest.
+#
+#   python warm_cache.py --from-year 2023 --to-year 2025 --workers 4
+
+# First season the dashboard offers
+FIRST_SEASON = 2023
+
+# Tiers and derived tables per session type, under the names the views load them by
+SESSION_TIERS = {
+    "Race": ("laps", "weather", "telemetry"),
+    "Q": ("laps",),
+}
+DERIVED_TABLES = {
+    "Race": {
+        "results": (build_results, ("laps",)),
+        "stints": (build_stints, ("laps",)),
+        "lap_weather": (build_lap_weather, ("laps", "weather")),
+        "lap_times": (build_lap_times, ("laps",)),
+        "degradation": (build_degradation, ("laps", "telemetry")),
+    },
+    "Q": {
+        "results": (build_results, ("laps",)),
+    },
+}
+
+MANIFEST_PATH = os.path.join(CACHE_DIR, f"fastf1-{fastf1.__version__}", "warm_manifest.json")
+
+# --- Manifest of finished sessions ---
+def read_manifest(path=MANIFEST_PATH):
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    # Tables written by older builders are not reused, so neither is the manifest
+    if manifest.get("derived_version") != DERIVED_VERSION:
+        manifest = {"derived_version": DERIVED_VERSION, "done": {}}
+    return manifest
+
+def write_manifest(manifest, path=MANIFEST_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, path)
+
+def manifest_key(key):
+    return "/".join(str(part) for part in key)
+
+# --- Sessions of finished events in the season range ---
+def season_sessions(from_year, to_year, session_types):
+    today = pd.Timestamp.now()
+    index = get_event_index()
+    keys = []
+    for year in range(from_year, to_year + 1):
+        for event in sorted(index.events(year), key=lambda event: event["RoundNumber"]):
+            if event["RoundNumber"] <= 0 or event["EventDate"] is None:
+                continue
+            if pd.Timestamp(event["EventDate"]) >= today:
+                continue
+            keys.extend((year, event["EventName"], session_type) for session_type in session_types)
+    return keys
+
+# --- One session, in a worker process: tiers, derived tables and lap telemetry to disk ---
+def warm_session(key):
+    start = time.perf_counter()
+    session_type = key[2]
+    store = SessionStore(SESSION_CACHE_BYTES)
+    session = store.get(key, SESSION_TIERS[session_type])
+    if not is_cacheable(session):
+        return "skipped (not finished)", time.perf_counter() - start
+
+    for name, (build, tiers) in DERIVED_TABLES[session_type].items():
+        store.derived(key, name, build, tiers)
+    if "telemetry" in SESSION_TIERS[session_type]:
+        for driver in session.laps["Driver"].dropna().unique():
+            write_lap_slices(session, key, driver)
+    return "ok", time.perf_counter() - start
+
+def main():
+    current_year = datetime.date.today().year
+    parser = argparse.ArgumentParser(description="Precompute the dashboard's on-disk cache for whole seasons.")
+    parser.add_argument("--from-year", type=int, default=FIRST_SEASON)
+    parser.add_argument("--to-year", type=int, default=current_year)
+    parser.add_argument("--sessions", nargs="+", choices=list(SESSION_TIERS), default=list(SESSION_TIERS))
+    parser.add_argument("--workers", type=int, default=max((os.cpu_count() or 2) // 2, 1))
+    parser.add_argument("--force", action="store_true", help="redo sessions already in the manifest")
+    args = parser.parse_args()
+
+    if CACHE_BACKEND == "memory":
+        # Workers would fill their own memory and exit with it
+        print("F1_CACHE_BACKEND=memory keeps the cache inside one process; nothing to warm")
+        return 2
+
+    manifest = read_manifest()
+    if args.force:
+        manifest["done"] = {}
+    keys = season_sessions(args.from_year, args.to_year, args.sessions)
+    todo = [key for key in keys if manifest_key(key) not in manifest["done"]]
+    print(f"{len(keys)} sessions in {args.from_year}-{args.to_year}, {len(keys) - len(todo)} already cached, "
+          f"{len(todo)} to do with {args.workers} workers", flush=True)
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(warm_session, key): key for key in todo}
+        for count, future in enumerate(as_completed(futures), start=1):
+            key = futures[future]
+            year, event, session_type = key
+            try:
+                status, seconds = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"[{count}/{len(todo)}] {year} {event} {session_type}: failed ({e})", flush=True)
+                continue
+            print(f"[{count}/{len(todo)}] {year} {event} {session_type}: {status} ({seconds:.1f}s)", flush=True)
+            if status == "ok":
+                manifest["done"][manifest_key(key)] = datetime.datetime.now().isoformat(timespec="seconds")
+                write_manifest(manifest)
+
+    print(f"Done: {len(todo) - failed} finished, {failed} failed", flush=True)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())